@@ -1,8 +1,10 @@
 import streamlit as st
 import os
+import io
 import pandas as pd
-from utils.drive_connector import DriveConnector
-from utils.excel_processor import ExcelProcessor
+from utils import data_cache
+from utils.fast_stats import count_missing
+from utils.graph_generator import downsample, to_plot_array
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -14,6 +16,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Rows of raw sheet data sent to the browser
+RAW_DATA_PREVIEW_ROWS = 500
+
 # Initialize session state
 if 'selected_project' not in st.session_state:
     st.session_state.selected_project = None
@@ -25,9 +30,7 @@ if 'selected_sheet' not in st.session_state:
 def main():
     st.title("🏗️ Construction Project Management Dashboard")
     
-    # Initialize drive connector
-    drive_connector = DriveConnector()
-    excel_processor = ExcelProcessor()
+    excel_processor = data_cache.get_excel_processor()
     
     # Sidebar navigation
     st.sidebar.title("Navigation")
@@ -42,7 +45,8 @@ def main():
     
     # Get project folders
     try:
-        projects = drive_connector.get_project_folders(construction_folder)
+        projects = data_cache.get_project_folders(construction_folder)
+        project_paths = {project: os.path.join(construction_folder, project) for project in projects}
         
         if not projects:
             st.warning("No project folders found in the Construction directory")
@@ -57,10 +61,10 @@ def main():
         
         if selected_project != "Select a project...":
             st.session_state.selected_project = selected_project
-            project_path = os.path.join(construction_folder, selected_project)
+            project_path = project_paths[selected_project]
             
             # Get Excel files in the project
-            excel_files = drive_connector.get_excel_files(project_path)
+            excel_files = data_cache.get_excel_files(project_path)
             
             if excel_files:
                 selected_file = st.sidebar.selectbox(
@@ -74,7 +78,7 @@ def main():
                     file_path = os.path.join(project_path, selected_file)
                     
                     # Get sheets in the Excel file
-                    sheets = excel_processor.get_sheet_names(file_path)
+                    sheets = data_cache.get_sheet_names(file_path)
                     
                     if sheets:
                         selected_sheet = st.sidebar.selectbox(
@@ -90,95 +94,95 @@ def main():
                 st.sidebar.warning("No Excel files found in this project")
         
         # Display overall summary
-        display_construction_summary(construction_folder, drive_connector)
+        display_construction_summary(project_paths)
         
     except Exception as e:
         st.error(f"Error accessing construction folder: {str(e)}")
 
-def display_construction_summary(construction_folder, drive_connector):
-    """Display overall construction project summary"""
+def display_construction_summary(project_paths):
+    """Display overall construction project summary, given {project: folder path}"""
     st.header("📊 Construction Folder Summary")
     
+    # Building the summary opens every workbook, so only do it on request
+    if not st.toggle("Show construction folder summary", key="show_summary"):
+        return
+    
     try:
-        projects = drive_connector.get_project_folders(construction_folder)
-        
-        if projects:
+        if project_paths:
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.metric("Total Projects", len(projects))
+                st.metric("Total Projects", len(project_paths))
             
-            total_files = 0
-            total_sheets = 0
+            project_files = {}
+            for project, project_path in project_paths.items():
+                excel_files = data_cache.get_excel_files(project_path)
+                project_files[project] = [os.path.join(project_path, file) for file in excel_files]
             
-            project_data = []
+            # Open all workbooks concurrently
+            all_files = [file_path for file_paths in project_files.values() for file_path in file_paths]
+            sheet_counts = dict(zip(all_files, data_cache.scan_in_parallel(_count_sheets, all_files)))
             
-            for project in projects:
-                project_path = os.path.join(construction_folder, project)
-                excel_files = drive_connector.get_excel_files(project_path)
-                file_count = len(excel_files)
-                total_files += file_count
-                
-                sheet_count = 0
-                for file in excel_files:
-                    try:
-                        file_path = os.path.join(project_path, file)
-                        excel_processor = ExcelProcessor()
-                        sheets = excel_processor.get_sheet_names(file_path)
-                        sheet_count += len(sheets)
-                    except:
-                        pass
-                
-                total_sheets += sheet_count
-                project_data.append({
-                    'Project': project,
-                    'Excel Files': file_count,
-                    'Total Sheets': sheet_count
-                })
+            df = pd.DataFrame({
+                'Project': list(project_files),
+                'Excel Files': [len(file_paths) for file_paths in project_files.values()],
+                'Total Sheets': [
+                    sum(sheet_counts[file_path] for file_path in file_paths)
+                    for file_paths in project_files.values()
+                ]
+            })
             
             with col2:
-                st.metric("Total Excel Files", total_files)
+                st.metric("Total Excel Files", int(df['Excel Files'].sum()))
             
             with col3:
-                st.metric("Total Sheets", total_sheets)
+                st.metric("Total Sheets", int(df['Total Sheets'].sum()))
             
             # Project breakdown table
-            if project_data:
+            if not df.empty:
                 st.subheader("Project Breakdown")
-                df = pd.DataFrame(project_data)
                 st.dataframe(df, use_container_width=True)
                 
                 # Visual charts
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig_files = px.bar(
-                        df, 
-                        x='Project', 
-                        y='Excel Files',
-                        title="Excel Files per Project"
+                    fig_files = go.Figure(go.Bar(
+                        x=df['Project'].to_numpy(),
+                        y=df['Excel Files'].to_numpy()
+                    ))
+                    fig_files.update_layout(
+                        title="Excel Files per Project",
+                        xaxis_title='Project',
+                        yaxis_title='Excel Files'
                     )
                     st.plotly_chart(fig_files, use_container_width=True)
                 
                 with col2:
-                    fig_sheets = px.pie(
-                        df, 
-                        values='Total Sheets', 
-                        names='Project',
-                        title="Sheet Distribution by Project"
-                    )
+                    fig_sheets = go.Figure(go.Pie(
+                        labels=df['Project'].to_numpy(),
+                        values=df['Total Sheets'].to_numpy()
+                    ))
+                    fig_sheets.update_layout(title="Sheet Distribution by Project")
                     st.plotly_chart(fig_sheets, use_container_width=True)
         
     except Exception as e:
         st.error(f"Error generating summary: {str(e)}")
 
+def _count_sheets(file_path):
+    """Count sheets in a file, treating unreadable files as empty"""
+    try:
+        return len(data_cache.get_sheet_names(file_path))
+    except Exception:
+        return 0
+
 def display_sheet_analysis(file_path, sheet_name, excel_processor):
     """Display analysis for selected sheet"""
     st.header(f"📈 Analysis: {sheet_name}")
     
     try:
         # Load data
-        df = excel_processor.load_sheet_data(file_path, sheet_name)
+        df = data_cache.load_sheet_data(file_path, sheet_name)
         
         if df is not None and not df.empty:
             # Display basic info
@@ -188,34 +192,16 @@ def display_sheet_analysis(file_path, sheet_name, excel_processor):
             with col2:
                 st.metric("Columns", len(df.columns))
             with col3:
-                st.metric("Non-null Values", df.count().sum())
+                st.metric("Non-null Values", df.size - count_missing(df))
             
             # Column selection for visualization
             st.subheader("📊 Create Visualizations")
             
             # Get numeric and categorical columns
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-            categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-            all_cols = df.columns.tolist()
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                selected_columns = st.multiselect(
-                    "Select columns for visualization",
-                    all_cols,
-                    help="Choose columns to create graphs"
-                )
+            numeric_cols, categorical_cols = data_cache.get_column_groups(file_path, sheet_name, df)
             
-            with col2:
-                chart_type = st.selectbox(
-                    "Chart Type",
-                    ["Bar Chart", "Line Chart", "Scatter Plot", "Pie Chart", "Histogram"]
-                )
-            
-            # Generate visualization
-            if selected_columns:
-                generate_visualization(df, selected_columns, chart_type)
+            # Column and chart pickers rerun on their own; the buttons below rerun the page
+            selected_columns, chart_type = chart_fragment(df, file_path, sheet_name)
             
             # Statistics creation button
             if st.button("📊 Create/Update Statistics Sheet"):
@@ -238,24 +224,28 @@ def display_sheet_analysis(file_path, sheet_name, excel_processor):
                     # Generate graphs for PowerPoint
                     graphs = []
                     if selected_columns and len(selected_columns) >= 2:
-                        fig = create_chart(df, selected_columns, chart_type)
+                        fig = create_chart(df, selected_columns, chart_type, file_path, sheet_name)
                         graphs.append({
                             'title': f"{chart_type} - {', '.join(selected_columns)}",
                             'figure': fig
                         })
                     
                     if graphs:
-                        ppt_path = ppt_gen.create_presentation(graphs, f"{sheet_name}_Report")
-                        st.success(f"PowerPoint report generated: {ppt_path}")
+                        ppt_buffer = io.BytesIO()
+                        ppt_name = ppt_gen.create_presentation(graphs, f"{sheet_name}_Report", out=ppt_buffer)
                         
-                        # Provide download link
-                        with open(ppt_path, "rb") as file:
+                        if ppt_name:
+                            st.success(f"PowerPoint report generated: {ppt_name}")
+                            
+                            # Provide download link
                             st.download_button(
                                 label="Download PowerPoint",
-                                data=file.read(),
+                                data=ppt_buffer.getvalue(),
                                 file_name=f"{sheet_name}_Report.pptx",
                                 mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
                             )
+                        else:
+                            st.error("Failed to generate PowerPoint report")
                     else:
                         st.warning("Please select at least 2 columns to generate PowerPoint report")
                         
@@ -264,7 +254,10 @@ def display_sheet_analysis(file_path, sheet_name, excel_processor):
             
             # Display raw data
             with st.expander("View Raw Data"):
-                st.dataframe(df, use_container_width=True)
+                # The expander body is sent on every rerun, so only ship a preview
+                st.dataframe(df.head(RAW_DATA_PREVIEW_ROWS), use_container_width=True)
+                if len(df) > RAW_DATA_PREVIEW_ROWS:
+                    st.caption(f"Showing first {RAW_DATA_PREVIEW_ROWS} of {len(df)} rows")
                 
         else:
             st.warning("No data found in the selected sheet")
@@ -272,14 +265,40 @@ def display_sheet_analysis(file_path, sheet_name, excel_processor):
     except Exception as e:
         st.error(f"Error loading sheet data: {str(e)}")
 
-def generate_visualization(df, selected_columns, chart_type):
+@st.fragment
+def chart_fragment(df, file_path, sheet_name):
+    """Column selection and chart, rerun without the rest of the page"""
+    all_cols = df.columns.tolist()
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        selected_columns = st.multiselect(
+            "Select columns for visualization",
+            all_cols,
+            help="Choose columns to create graphs"
+        )
+    
+    with col2:
+        chart_type = st.selectbox(
+            "Chart Type",
+            ["Bar Chart", "Line Chart", "Scatter Plot", "Pie Chart", "Histogram"]
+        )
+    
+    # Generate visualization
+    if selected_columns:
+        generate_visualization(df, selected_columns, chart_type, file_path, sheet_name)
+    
+    return selected_columns, chart_type
+
+def generate_visualization(df, selected_columns, chart_type, file_path, sheet_name):
     """Generate visualization based on selected columns and chart type"""
     try:
         if len(selected_columns) < 1:
             st.warning("Please select at least one column")
             return
         
-        fig = create_chart(df, selected_columns, chart_type)
+        fig = create_chart(df, selected_columns, chart_type, file_path, sheet_name)
         
         if fig:
             st.plotly_chart(fig, use_container_width=True)
@@ -287,9 +306,14 @@ def generate_visualization(df, selected_columns, chart_type):
     except Exception as e:
         st.error(f"Error creating visualization: {str(e)}")
 
-def create_chart(df, selected_columns, chart_type):
+def create_chart(df, selected_columns, chart_type, file_path, sheet_name):
     """Create chart based on type and columns"""
     try:
+        # Line and scatter charts only need enough points to show the shape of the data.
+        # Bar charts add up repeated categories, so sampling rows would shrink the bars
+        if chart_type in ("Line Chart", "Scatter Plot"):
+            df = downsample(df, selected_columns[:2])
+        
         if chart_type == "Bar Chart":
             if len(selected_columns) >= 2:
                 return px.bar(df, x=selected_columns[0], y=selected_columns[1])
@@ -298,13 +322,24 @@ def create_chart(df, selected_columns, chart_type):
                 
         elif chart_type == "Line Chart":
             if len(selected_columns) >= 2:
-                return px.line(df, x=selected_columns[0], y=selected_columns[1])
+                x_title, y_col = selected_columns[0], selected_columns[1]
+                x_values = to_plot_array(df[x_title])
             else:
-                return px.line(df, y=selected_columns[0])
+                x_title, y_col = "index", selected_columns[0]
+                x_values = df.index.to_numpy()
+            fig = go.Figure(go.Scattergl(x=x_values, y=to_plot_array(df[y_col]), mode='lines'))
+            fig.update_layout(xaxis_title=x_title, yaxis_title=y_col)
+            return fig
                 
         elif chart_type == "Scatter Plot":
             if len(selected_columns) >= 2:
-                return px.scatter(df, x=selected_columns[0], y=selected_columns[1])
+                fig = go.Figure(go.Scattergl(
+                    x=to_plot_array(df[selected_columns[0]]),
+                    y=to_plot_array(df[selected_columns[1]]),
+                    mode='markers'
+                ))
+                fig.update_layout(xaxis_title=selected_columns[0], yaxis_title=selected_columns[1])
+                return fig
             else:
                 st.warning("Scatter plot requires at least 2 columns")
                 return None
@@ -312,15 +347,15 @@ def create_chart(df, selected_columns, chart_type):
         elif chart_type == "Pie Chart":
             if len(selected_columns) >= 1:
                 # Use value counts for categorical data
-                if df[selected_columns[0]].dtype == 'object':
-                    value_counts = df[selected_columns[0]].value_counts()
-                    return px.pie(values=value_counts.values, names=value_counts.index)
+                if not pd.api.types.is_numeric_dtype(df[selected_columns[0]]):
+                    names, values = data_cache.top_value_counts(file_path, sheet_name, df, selected_columns[0])
+                    return go.Figure(go.Pie(labels=names, values=values))
                 else:
                     return px.pie(df, values=selected_columns[0])
             
         elif chart_type == "Histogram":
             if len(selected_columns) >= 1:
-                return px.histogram(df, x=selected_columns[0])
+                return data_cache.get_graph_generator().create_histogram(df, selected_columns[0])
                 
         return None
         
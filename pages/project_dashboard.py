@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.drive_connector import DriveConnector
-from utils.excel_processor import ExcelProcessor
+from utils import data_cache
+from utils.fast_stats import count_missing
+from utils.graph_generator import WEBGL_THRESHOLD, downsample
 import os
 
+def _scan_file(file_path):
+    """Get sheet count and total record count of a file, treating unreadable files as empty"""
+    try:
+        # One workbook open covers every sheet (row counts only, no cell data)
+        row_counts = data_cache.get_sheet_row_counts(file_path)
+    except Exception:
+        # Listings are cached briefly, so the file may have been moved or deleted since
+        return 0, 0
+    return len(row_counts), sum(row_counts.values())
+
 def show_project_dashboard():
     """Display project-specific dashboard"""
     st.title("📊 Project Dashboard")
@@ -19,12 +30,8 @@ def show_project_dashboard():
     
     st.header(f"Project: {project}")
     
-    # Initialize utilities
-    drive_connector = DriveConnector()
-    excel_processor = ExcelProcessor()
-    
     # Get all Excel files in the project
-    excel_files = drive_connector.get_excel_files(project_path)
+    excel_files = data_cache.get_excel_files(project_path)
     
     if not excel_files:
         st.warning("No Excel files found in this project")
@@ -42,22 +49,11 @@ def show_project_dashboard():
     # Process each file to get statistics
     file_data = []
     
-    for file in excel_files:
-        file_path = os.path.join(project_path, file)
-        sheets = excel_processor.get_sheet_names(file_path)
-        sheet_count = len(sheets)
+    file_paths = [os.path.join(project_path, file) for file in excel_files]
+    file_stats = data_cache.scan_in_parallel(_scan_file, file_paths)
+    
+    for file, (sheet_count, file_records) in zip(excel_files, file_stats):
         total_sheets += sheet_count
-        
-        # Count total records across all sheets
-        file_records = 0
-        for sheet in sheets:
-            try:
-                df = excel_processor.load_sheet_data(file_path, sheet)
-                if df is not None:
-                    file_records += len(df)
-            except:
-                pass
-        
         total_records += file_records
         
         file_data.append({
@@ -112,7 +108,7 @@ def show_project_dashboard():
     
     if selected_file != "Select a file...":
         file_path = os.path.join(project_path, selected_file)
-        sheets = excel_processor.get_sheet_names(file_path)
+        sheets = data_cache.get_sheet_names(file_path)
         
         if sheets:
             selected_sheet = st.selectbox(
@@ -122,11 +118,13 @@ def show_project_dashboard():
             
             if selected_sheet != "Select a sheet...":
                 # Display sheet data
-                df = excel_processor.load_sheet_data(file_path, selected_sheet)
+                df = data_cache.load_sheet_data(file_path, selected_sheet)
                 
                 if df is not None and not df.empty:
                     st.subheader(f"Sheet: {selected_sheet}")
                     
+                    numeric_cols, _ = data_cache.get_column_groups(file_path, selected_sheet, df)
+                    
                     # Sheet statistics
                     col1, col2, col3, col4 = st.columns(4)
                     
@@ -135,9 +133,9 @@ def show_project_dashboard():
                     with col2:
                         st.metric("Columns", len(df.columns))
                     with col3:
-                        st.metric("Numeric Columns", len(df.select_dtypes(include=['number']).columns))
+                        st.metric("Numeric Columns", len(numeric_cols))
                     with col4:
-                        st.metric("Non-null Values", df.count().sum())
+                        st.metric("Non-null Values", df.size - count_missing(df))
                     
                     # Display data sample
                     st.subheader("Data Preview")
@@ -146,21 +144,17 @@ def show_project_dashboard():
                     # Column information
                     st.subheader("Column Information")
                     
-                    column_info = []
-                    for col in df.columns:
-                        column_info.append({
-                            'Column': col,
-                            'Type': str(df[col].dtype),
-                            'Non-null': df[col].count(),
-                            'Unique': df[col].nunique(),
-                            'Sample': str(df[col].iloc[0]) if len(df) > 0 else 'N/A'
-                        })
-                    
-                    df_columns = pd.DataFrame(column_info)
+                    first_row = df.iloc[0]
+                    df_columns = pd.DataFrame({
+                        'Column': df.columns,
+                        'Type': df.dtypes.astype(str).values,
+                        'Non-null': df.count().values,
+                        'Unique': df.nunique().values,
+                        'Sample': [str(value) for value in first_row.values]
+                    })
                     st.dataframe(df_columns, use_container_width=True)
                     
                     # Quick visualization
-                    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
                     if len(numeric_cols) >= 1:
                         st.subheader("Quick Visualization")
                         
@@ -172,13 +166,20 @@ def show_project_dashboard():
                                 y_col = st.selectbox("Y-axis", numeric_cols, index=1 if len(numeric_cols) > 1 else 0, key="y_axis")
                             
                             if x_col and y_col:
-                                fig = px.scatter(df, x=x_col, y=y_col, title=f"{y_col} vs {x_col}")
+                                plot_df = downsample(df, [x_col, y_col])
+                                fig = px.scatter(
+                                    plot_df,
+                                    x=x_col,
+                                    y=y_col,
+                                    title=f"{y_col} vs {x_col}",
+                                    render_mode='webgl' if len(plot_df) > WEBGL_THRESHOLD else 'svg'
+                                )
                                 st.plotly_chart(fig, use_container_width=True)
                         
                         # Single column histogram
                         selected_col = st.selectbox("Select column for histogram", numeric_cols, key="hist_col")
                         if selected_col:
-                            fig_hist = px.histogram(df, x=selected_col, title=f"Distribution of {selected_col}")
+                            fig_hist = data_cache.get_graph_generator().create_histogram(df, selected_col)
                             st.plotly_chart(fig_hist, use_container_width=True)
 
 if __name__ == "__main__":
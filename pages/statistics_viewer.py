@@ -1,11 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.excel_processor import ExcelProcessor
-from utils.graph_generator import GraphGenerator
-from utils.ppt_generator import PPTGenerator
+from utils import data_cache
+from utils.fast_stats import col_stats, count_missing
+from utils.graph_generator import WEBGL_THRESHOLD, downsample, lttb_downsample, to_plot_array
 import os
+import io
+
+# Columns shown in the Relationships tab scatter matrix
+SCATTER_MATRIX_MAX_DIMS = 6
 
 def show_statistics_viewer():
     """Display statistics viewer page"""
@@ -30,17 +35,22 @@ def show_statistics_viewer():
     st.header(f"Statistics for: {project} / {file} / {sheet}")
     
     # Initialize utilities
-    excel_processor = ExcelProcessor()
-    graph_generator = GraphGenerator()
+    excel_processor = data_cache.get_excel_processor()
+    graph_generator = data_cache.get_graph_generator()
     
     try:
         # Load data
-        df = excel_processor.load_sheet_data(file_path, sheet)
+        df = data_cache.load_sheet_data(file_path, sheet)
         
         if df is None or df.empty:
             st.error("No data found in the selected sheet")
             return
         
+        # Get different types of columns
+        numeric_cols, categorical_cols = data_cache.get_column_groups(file_path, sheet, df)
+        datetime_cols = df.select_dtypes(include=['datetime']).columns.tolist()
+        all_cols = df.columns.tolist()
+        
         # Display basic statistics
         st.subheader("📊 Basic Statistics")
         
@@ -50,19 +60,13 @@ def show_statistics_viewer():
         with col2:
             st.metric("Total Columns", len(df.columns))
         with col3:
-            st.metric("Numeric Columns", len(df.select_dtypes(include=['number']).columns))
+            st.metric("Numeric Columns", len(numeric_cols))
         with col4:
-            st.metric("Missing Values", df.isnull().sum().sum())
+            st.metric("Missing Values", count_missing(df))
         
         # Column selection for analysis
         st.subheader("🎯 Column Selection for Analysis")
         
-        # Get different types of columns
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        datetime_cols = df.select_dtypes(include=['datetime']).columns.tolist()
-        all_cols = df.columns.tolist()
-        
         # Multi-select for columns
         selected_columns = st.multiselect(
             "Select columns for analysis",
@@ -75,19 +79,21 @@ def show_statistics_viewer():
             # Display selected columns info
             st.subheader("📋 Selected Columns Information")
             
-            col_info = []
-            for col in selected_columns:
-                col_info.append({
-                    'Column': col,
-                    'Type': str(df[col].dtype),
-                    'Non-null Count': df[col].count(),
-                    'Unique Values': df[col].nunique(),
-                    'Min': df[col].min() if pd.api.types.is_numeric_dtype(df[col]) else 'N/A',
-                    'Max': df[col].max() if pd.api.types.is_numeric_dtype(df[col]) else 'N/A',
-                    'Mean': round(df[col].mean(), 2) if pd.api.types.is_numeric_dtype(df[col]) else 'N/A'
-                })
+            # One reduction per statistic across all selected columns
+            selected_df = df[selected_columns]
+            numeric_selected = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
+            stats = col_stats(selected_df, numeric_selected) if numeric_selected else None
+            
+            df_col_info = pd.DataFrame({
+                'Column': selected_columns,
+                'Type': selected_df.dtypes.astype(str).to_numpy(),
+                'Non-null Count': selected_df.count().to_numpy(),
+                'Unique Values': selected_df.nunique().to_numpy(),
+                'Min': [stats.at['min', col] if col in numeric_selected else 'N/A' for col in selected_columns],
+                'Max': [stats.at['max', col] if col in numeric_selected else 'N/A' for col in selected_columns],
+                'Mean': [round(stats.at['mean', col], 2) if col in numeric_selected else 'N/A' for col in selected_columns]
+            })
             
-            df_col_info = pd.DataFrame(col_info)
             st.dataframe(df_col_info, use_container_width=True)
             
             # Visualization options
@@ -112,7 +118,7 @@ def show_statistics_viewer():
             
             with col3:
                 if st.button("🎨 Generate Visualization"):
-                    create_visualization(df, selected_columns, chart_type, x_axis, y_axis, graph_generator)
+                    create_visualization(df, selected_columns, chart_type, x_axis, y_axis, graph_generator, file_path, sheet)
             
             # Pre-generated visualizations for all selected columns
             if len(selected_columns) >= 1:
@@ -122,16 +128,16 @@ def show_statistics_viewer():
                 tab1, tab2, tab3, tab4 = st.tabs(["Distribution", "Relationships", "Summary", "Trends"])
                 
                 with tab1:
-                    create_distribution_charts(df, selected_columns)
+                    create_distribution_charts(df, numeric_selected, file_path, sheet)
                 
                 with tab2:
-                    create_relationship_charts(df, selected_columns)
+                    create_relationship_charts(df, numeric_selected, file_path, sheet)
                 
                 with tab3:
-                    create_summary_charts(df, selected_columns)
+                    create_summary_charts(df, numeric_selected, file_path, sheet)
                 
                 with tab4:
-                    create_trend_charts(df, selected_columns)
+                    create_trend_charts(df, numeric_selected, file_path, sheet)
             
             # Statistics sheet management
             st.subheader("📊 Statistics Sheet Management")
@@ -149,7 +155,7 @@ def show_statistics_viewer():
             
             with col2:
                 # Check if statistics sheet exists
-                has_stats = excel_processor.has_statistics_sheet(file_path)
+                has_stats = data_cache.has_statistics_sheet(file_path)
                 if has_stats:
                     st.success("✅ Statistics sheet exists")
                 else:
@@ -195,19 +201,50 @@ def show_statistics_viewer():
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
 
-def create_visualization(df, selected_columns, chart_type, x_axis, y_axis, graph_generator):
+def _category_value_pair(df, col_a, col_b):
+    """Get (category, value) columns when exactly one of two columns is numeric, otherwise None"""
+    if not col_a or not col_b or col_a == col_b:
+        return None
+    a_numeric = pd.api.types.is_numeric_dtype(df[col_a])
+    b_numeric = pd.api.types.is_numeric_dtype(df[col_b])
+    if a_numeric == b_numeric:
+        return None
+    return (col_b, col_a) if a_numeric else (col_a, col_b)
+
+def _grouped_frame(df, key_col, value_col, file_path, sheet_name, include_negative=True):
+    """Get value_col summed per key_col value as a small frame, the way bars and pie slices add up"""
+    # Positive and negative rows are summed apart: stacked bars draw them above and below zero,
+    # and pie charts leave negative values out
+    keys, positive, negative = data_cache.get_group_sums(file_path, sheet_name, df, key_col, value_col)
+    frame = pd.DataFrame({key_col: keys, value_col: positive})
+    if include_negative and negative.any():
+        has_negative = negative != 0
+        frame = pd.concat([frame, pd.DataFrame({key_col: keys[has_negative], value_col: negative[has_negative]})], ignore_index=True)
+    return frame
+
+def create_visualization(df, selected_columns, chart_type, x_axis, y_axis, graph_generator, file_path, sheet_name):
     """Create and display visualization based on user selection"""
     try:
         fig = None
         
         if chart_type == "Bar Chart" and x_axis and y_axis:
-            fig = graph_generator.create_bar_chart(df, x_axis, y_axis)
+            # Bars of repeated categories stack up, draw one pre-summed bar per category instead
+            pair = _category_value_pair(df, x_axis, y_axis)
+            if pair and pair[0] == x_axis:
+                fig = graph_generator.create_bar_chart(_grouped_frame(df, *pair, file_path, sheet_name), x_axis, y_axis)
+            else:
+                fig = graph_generator.create_bar_chart(df, x_axis, y_axis)
         elif chart_type == "Line Chart" and x_axis and y_axis:
             fig = graph_generator.create_line_chart(df, x_axis, y_axis)
         elif chart_type == "Scatter Plot" and x_axis and y_axis:
             fig = graph_generator.create_scatter_plot(df, x_axis, y_axis)
         elif chart_type == "Pie Chart" and x_axis:
-            fig = graph_generator.create_pie_chart(df, x_axis, y_axis)
+            # Slices sum their values per name, do that once here rather than in the browser
+            pair = _category_value_pair(df, x_axis, y_axis)
+            if pair and pair[0] == y_axis:
+                fig = graph_generator.create_pie_chart(_grouped_frame(df, *pair, file_path, sheet_name, include_negative=False), x_axis, y_axis)
+            else:
+                fig = graph_generator.create_pie_chart(df, x_axis, y_axis)
         elif chart_type == "Histogram" and x_axis:
             fig = graph_generator.create_histogram(df, x_axis)
         elif chart_type == "Box Plot" and x_axis:
@@ -221,84 +258,158 @@ def create_visualization(df, selected_columns, chart_type, x_axis, y_axis, graph
     except Exception as e:
         st.error(f"Error creating visualization: {str(e)}")
 
-def create_distribution_charts(df, selected_columns):
-    """Create distribution charts for selected columns"""
-    numeric_cols = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
-    
+def create_distribution_charts(df, numeric_cols, file_path, sheet_name):
+    """Create distribution charts for the selected numeric columns"""
     if numeric_cols:
-        for col in numeric_cols:
-            fig = px.histogram(df, x=col, title=f"Distribution of {col}")
+        for fig in data_cache.get_figures(file_path, sheet_name, _distribution_figures, df, numeric_cols):
             st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No numeric columns selected for distribution analysis")
 
-def create_relationship_charts(df, selected_columns):
-    """Create relationship charts between selected columns"""
-    numeric_cols = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
+def _distribution_figures(df, numeric_cols):
+    """Build one histogram per numeric column"""
+    graph_generator = data_cache.get_graph_generator()
+    return [graph_generator.create_histogram(df, col) for col in numeric_cols]
+
+def _correlation_matrix(df, columns):
+    """Pearson correlation over pairwise complete rows, like DataFrame.corr"""
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if present.all():
+            corr = np.corrcoef(values, rowvar=False)
+        else:
+            # Per-pair sums over the rows where both columns have a value, as matrix products.
+            # Centering first keeps the sums small, so constant columns give exactly zero variance
+            mask = present.astype(np.float64)
+            filled = np.where(present, values - np.nanmean(values, axis=0), 0.0)
+            n = mask.T @ mask
+            sum_x = filled.T @ mask
+            sum_xx = (filled * filled).T @ mask
+            cov = filled.T @ filled - sum_x * sum_x.T / n
+            var_x = sum_xx - sum_x * sum_x / n
+            corr = cov / np.sqrt(var_x * var_x.T)
+            corr = np.clip(corr, -1.0, 1.0)
+            corr[n < 2] = np.nan
     
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+def create_relationship_charts(df, numeric_cols, file_path, sheet_name):
+    """Create relationship charts between the selected numeric columns"""
     if len(numeric_cols) >= 2:
-        # Correlation heatmap
-        if len(numeric_cols) > 2:
-            corr_matrix = df[numeric_cols].corr()
-            fig = px.imshow(corr_matrix, title="Correlation Matrix")
-            st.plotly_chart(fig, use_container_width=True)
+        heatmap, scatter, shown_cols = data_cache.get_figures(file_path, sheet_name, _relationship_figures, df, numeric_cols)
         
-        # Scatter plots for pairs
-        for i in range(len(numeric_cols)):
-            for j in range(i+1, len(numeric_cols)):
-                fig = px.scatter(df, x=numeric_cols[i], y=numeric_cols[j], 
-                               title=f"{numeric_cols[j]} vs {numeric_cols[i]}")
-                st.plotly_chart(fig, use_container_width=True)
+        if heatmap is not None:
+            st.plotly_chart(heatmap, use_container_width=True)
+        
+        if len(shown_cols) < len(numeric_cols):
+            st.caption(f"Scatter matrix of the {len(shown_cols)} most correlated of {len(numeric_cols)} columns")
+        
+        st.plotly_chart(scatter, use_container_width=True)
     else:
         st.info("Need at least 2 numeric columns for relationship analysis")
 
-def create_summary_charts(df, selected_columns):
-    """Create summary charts for selected columns"""
-    numeric_cols = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
+def _relationship_figures(df, numeric_cols):
+    """Build the correlation heatmap and a single scatter figure for the selected columns"""
+    corr_matrix = _correlation_matrix(df, numeric_cols)
+    
+    # Correlation heatmap
+    heatmap = None
+    if len(numeric_cols) > 2:
+        heatmap = px.imshow(corr_matrix, title="Correlation Matrix")
+    
+    if len(numeric_cols) == 2:
+        x_col, y_col = numeric_cols
+        plot_df = downsample(df, numeric_cols)
+        scatter = px.scatter(
+            plot_df,
+            x=x_col,
+            y=y_col,
+            title=f"{y_col} vs {x_col}",
+            render_mode='webgl' if len(plot_df) > WEBGL_THRESHOLD else 'svg'
+        )
+        return heatmap, scatter, numeric_cols
     
+    shown_cols = numeric_cols
+    if len(numeric_cols) > SCATTER_MATRIX_MAX_DIMS:
+        # Take columns from the most strongly correlated pairs until the matrix is full
+        rows, cols = np.triu_indices(len(numeric_cols), k=1)
+        strength = np.nan_to_num(np.abs(corr_matrix.to_numpy()[rows, cols]), nan=-1.0)
+        picked = []
+        for pair in np.argsort(-strength, kind='stable'):
+            for index in (rows[pair], cols[pair]):
+                if index not in picked and len(picked) < SCATTER_MATRIX_MAX_DIMS:
+                    picked.append(index)
+            if len(picked) == SCATTER_MATRIX_MAX_DIMS:
+                break
+        shown_cols = [numeric_cols[i] for i in sorted(picked)]
+    
+    # One scatter matrix instead of a figure per column pair
+    scatter = px.scatter_matrix(downsample(df, shown_cols), dimensions=shown_cols, title="Scatter Matrix")
+    scatter.update_traces(diagonal_visible=False)
+    
+    return heatmap, scatter, shown_cols
+
+def create_summary_charts(df, numeric_cols, file_path, sheet_name):
+    """Create summary charts for the selected numeric columns"""
     if numeric_cols:
-        # Summary statistics
-        summary_stats = df[numeric_cols].describe()
-        fig = go.Figure()
-        
-        for col in numeric_cols:
-            fig.add_trace(go.Bar(
-                x=['Mean', 'Std', 'Min', 'Max'],
-                y=[summary_stats.loc['mean', col], summary_stats.loc['std', col], 
-                   summary_stats.loc['min', col], summary_stats.loc['max', col]],
-                name=col
-            ))
-        
-        fig.update_layout(title="Summary Statistics Comparison", barmode='group')
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Box plots
-        fig_box = go.Figure()
-        for col in numeric_cols:
-            fig_box.add_trace(go.Box(y=df[col], name=col))
-        fig_box.update_layout(title="Box Plot Comparison")
-        st.plotly_chart(fig_box, use_container_width=True)
+        for fig in data_cache.get_figures(file_path, sheet_name, _summary_figures, df, numeric_cols):
+            st.plotly_chart(fig, use_container_width=True)
+
+def _summary_figures(df, numeric_cols):
+    """Build the summary statistics bar chart and box plots"""
+    # Summary statistics
+    summary_stats = df[numeric_cols].describe()
+    fig = go.Figure()
+    
+    for col in numeric_cols:
+        fig.add_trace(go.Bar(
+            x=['Mean', 'Std', 'Min', 'Max'],
+            y=[summary_stats.loc['mean', col], summary_stats.loc['std', col], 
+               summary_stats.loc['min', col], summary_stats.loc['max', col]],
+            name=col
+        ))
+    
+    fig.update_layout(title="Summary Statistics Comparison", barmode='group')
+    
+    # Box plots
+    fig_box = go.Figure()
+    for col in numeric_cols:
+        fig_box.add_trace(go.Box(y=df[col], name=col))
+    fig_box.update_layout(title="Box Plot Comparison")
+    
+    return [fig, fig_box]
 
-def create_trend_charts(df, selected_columns):
+def create_trend_charts(df, numeric_cols, file_path, sheet_name):
     """Create trend charts if there are date columns"""
-    date_cols = [col for col in df.columns if 'date' in col.lower() or pd.api.types.is_datetime64_any_dtype(df[col])]
-    numeric_cols = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
+    # Date-like columns are recorded when the sheet is cleaned
+    date_cols = df.attrs.get('date_cols')
+    if date_cols is None:
+        date_cols = [col for col in df.columns if 'date' in str(col).lower() or pd.api.types.is_datetime64_any_dtype(df[col])]
     
     if date_cols and numeric_cols:
-        date_col = date_cols[0]
-        for num_col in numeric_cols:
-            try:
-                fig = px.line(df, x=date_col, y=num_col, title=f"{num_col} over time")
-                st.plotly_chart(fig, use_container_width=True)
-            except:
-                pass
+        for fig in data_cache.get_figures(file_path, sheet_name, _trend_figures, df, date_cols[0], numeric_cols):
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No date columns found for trend analysis")
 
+def _trend_figures(df, date_col, numeric_cols):
+    """Build one line chart over the date column per numeric column"""
+    figures = []
+    for num_col in numeric_cols:
+        try:
+            plot_df = lttb_downsample(df, date_col, num_col)
+            figures.append(px.line(plot_df, x=date_col, y=num_col, title=f"{num_col} over time"))
+        except:
+            pass
+    return figures
+
 def generate_powerpoint_report(df, selected_columns, export_options, sheet_name, graph_generator):
     """Generate PowerPoint report with selected visualizations"""
     try:
         with st.spinner("Generating PowerPoint report..."):
+            from utils.ppt_generator import PPTGenerator
             ppt_generator = PPTGenerator()
             
             graphs = []
@@ -306,17 +417,19 @@ def generate_powerpoint_report(df, selected_columns, export_options, sheet_name,
             # Generate graphs based on export options
             numeric_cols = [col for col in selected_columns if pd.api.types.is_numeric_dtype(df[col])]
             
+            # Extract each plotted column from the frame once, every chart below reuses the arrays
+            arrays = {col: to_plot_array(df[col]) for col in numeric_cols}
+            
             if "Distribution Charts" in export_options and numeric_cols:
                 for col in numeric_cols[:3]:  # Limit to first 3 to avoid too many slides
-                    fig = px.histogram(df, x=col, title=f"Distribution of {col}")
+                    fig = graph_generator.create_histogram_arr(arrays[col], col, title=f"Distribution of {col}")
                     graphs.append({
                         'title': f"Distribution of {col}",
                         'figure': fig
                     })
             
             if "Relationship Charts" in export_options and len(numeric_cols) >= 2:
-                fig = px.scatter(df, x=numeric_cols[0], y=numeric_cols[1], 
-                               title=f"{numeric_cols[1]} vs {numeric_cols[0]}")
+                fig = graph_generator.create_scatter_plot_arr(arrays[numeric_cols[0]], arrays[numeric_cols[1]], numeric_cols[0], numeric_cols[1])
                 graphs.append({
                     'title': f"Relationship: {numeric_cols[1]} vs {numeric_cols[0]}",
                     'figure': fig
@@ -326,7 +439,7 @@ def generate_powerpoint_report(df, selected_columns, export_options, sheet_name,
                 # Box plot
                 fig_box = go.Figure()
                 for col in numeric_cols:
-                    fig_box.add_trace(go.Box(y=df[col], name=col))
+                    fig_box.add_trace(go.Box(y=arrays[col], name=col))
                 fig_box.update_layout(title="Summary Statistics")
                 graphs.append({
                     'title': "Summary Statistics - Box Plot",
@@ -334,19 +447,18 @@ def generate_powerpoint_report(df, selected_columns, export_options, sheet_name,
                 })
             
             if graphs:
-                ppt_path = ppt_generator.create_presentation(graphs, f"{sheet_name}_Statistics_Report")
+                ppt_buffer = io.BytesIO()
                 
-                if ppt_path and os.path.exists(ppt_path):
+                if ppt_generator.create_presentation(graphs, f"{sheet_name}_Statistics_Report", out=ppt_buffer):
                     st.success("PowerPoint report generated successfully!")
                     
                     # Provide download
-                    with open(ppt_path, "rb") as file:
-                        st.download_button(
-                            label="📥 Download PowerPoint Report",
-                            data=file.read(),
-                            file_name=f"{sheet_name}_Statistics_Report.pptx",
-                            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                        )
+                    st.download_button(
+                        label="📥 Download PowerPoint Report",
+                        data=ppt_buffer.getvalue(),
+                        file_name=f"{sheet_name}_Statistics_Report.pptx",
+                        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+                    )
                 else:
                     st.error("Failed to generate PowerPoint report")
             else:
@@ -0,0 +1,135 @@
+import os
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.drive_connector import DriveConnector
+from utils.excel_processor import ExcelProcessor
+from utils.fast_stats import group_sums
+from utils.graph_generator import GraphGenerator
+
+# Cached wrappers around the file-system and Excel utilities. Streamlit reruns
+# the whole script on every widget interaction, so anything that touches disk
+# goes through here. File modification times are part of each cache key so an
+# edited workbook is picked up on the next rerun. Directory listings have no
+# cheap version stamp, so they expire after a short TTL instead.
+
+LISTING_TTL_SECONDS = 60
+
+@st.cache_resource
+def get_drive_connector() -> DriveConnector:
+    """Shared DriveConnector instance"""
+    return DriveConnector()
+
+@st.cache_resource
+def get_excel_processor() -> ExcelProcessor:
+    """Shared ExcelProcessor instance"""
+    return ExcelProcessor()
+
+@st.cache_resource
+def get_graph_generator() -> GraphGenerator:
+    """Shared GraphGenerator instance"""
+    return GraphGenerator()
+
+# Workbook scans are dominated by disk and zip I/O, so threads overlap well
+SCAN_WORKERS = 8
+
+def scan_in_parallel(func: Callable, items: Iterable) -> List[Any]:
+    """Apply func to each item on a thread pool, preserving order"""
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        return list(executor.map(func, items))
+
+@st.cache_data(ttl=LISTING_TTL_SECONDS, show_spinner=False)
+def get_project_folders(construction_folder: str) -> List[str]:
+    """Get project folders in the construction directory, cached briefly"""
+    return get_drive_connector().get_project_folders(construction_folder)
+
+@st.cache_data(ttl=LISTING_TTL_SECONDS, show_spinner=False)
+def get_excel_files(project_path: str) -> List[str]:
+    """Get Excel files in a project folder, cached briefly"""
+    return get_drive_connector().get_excel_files(project_path)
+
+@st.cache_data(show_spinner=False)
+def _cached_sheet_names(file_path: str, mtime: float) -> List[str]:
+    return get_excel_processor().get_sheet_names(file_path)
+
+def get_sheet_names(file_path: str) -> List[str]:
+    """Get sheet names of an Excel file, cached per file version"""
+    return _cached_sheet_names(file_path, os.path.getmtime(file_path))
+
+@st.cache_data(show_spinner=False)
+def _cached_has_statistics_sheet(file_path: str, mtime: float) -> bool:
+    return get_excel_processor().has_statistics_sheet(file_path)
+
+def has_statistics_sheet(file_path: str) -> bool:
+    """Check for a Statistics sheet, cached per file version"""
+    return _cached_has_statistics_sheet(file_path, os.path.getmtime(file_path))
+
+@st.cache_data(show_spinner="Loading sheet…", ttl=3600, max_entries=32)
+def _cached_load_sheet(file_path: str, sheet_name: str, mtime: float) -> Optional[pd.DataFrame]:
+    return get_excel_processor().load_sheet_data(file_path, sheet_name)
+
+def load_sheet_data(file_path: str, sheet_name: str) -> Optional[pd.DataFrame]:
+    """Load and clean a sheet, cached per file version"""
+    return _cached_load_sheet(file_path, sheet_name, os.path.getmtime(file_path))
+
+@st.cache_data(show_spinner=False)
+def _cached_sheet_row_counts(file_path: str, mtime: float) -> Dict[str, int]:
+    return get_excel_processor().get_sheet_row_counts(file_path)
+
+def get_sheet_row_counts(file_path: str) -> Dict[str, int]:
+    """Get data row counts of all sheets in a file, cached per file version"""
+    return _cached_sheet_row_counts(file_path, os.path.getmtime(file_path))
+
+@st.cache_data(show_spinner=False)
+def _cached_column_groups(file_path: str, sheet_name: str, mtime: float, _df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    # _df is not hashed; the loaded frame is fully determined by the other arguments
+    numeric_cols = _df.select_dtypes(include=['number']).columns.tolist()
+    categorical_cols = _df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+    return numeric_cols, categorical_cols
+
+def get_column_groups(file_path: str, sheet_name: str, df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """Get (numeric, categorical) column names of a loaded sheet, cached per file version"""
+    return _cached_column_groups(file_path, sheet_name, os.path.getmtime(file_path), df)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_group_sums(file_path: str, sheet_name: str, mtime: float, key_col: str, value_col: str, _df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Factorizing the key column is the expensive part. The key is always the category column,
+    # so bar and pie charts of the same category/value pair share this entry
+    return group_sums(_df[key_col], _df[value_col])
+
+def get_group_sums(file_path: str, sheet_name: str, df: pd.DataFrame, key_col: str, value_col: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get (keys, positive sums, negative sums) of value_col per distinct key_col value, cached per file version"""
+    return _cached_group_sums(file_path, sheet_name, os.path.getmtime(file_path), key_col, value_col, df)
+
+PIE_MAX_CATEGORIES = 30
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_top_value_counts(file_path: str, sheet_name: str, mtime: float, col: str, n: int, _df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    # _df is not hashed; the file version and column name identify the counts
+    counts = _df[col].value_counts()
+    # Categorical columns also list categories that never occur
+    counts = counts[counts > 0]
+    labels = counts.index.astype(str).to_numpy()[:n]
+    values = counts.to_numpy()[:n]
+    
+    if len(counts) > n:
+        labels = np.append(labels, 'Other')
+        values = np.append(values, counts.iloc[n:].sum())
+    
+    return labels, values
+
+def top_value_counts(file_path: str, sheet_name: str, df: pd.DataFrame, col: str, n: int = PIE_MAX_CATEGORIES) -> Tuple[np.ndarray, np.ndarray]:
+    """Get (labels, counts) of the n most frequent values of col, with the rest folded into 'Other', cached per file version"""
+    return _cached_top_value_counts(file_path, sheet_name, os.path.getmtime(file_path), col, n, df)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_figures(file_path: str, sheet_name: str, mtime: float, builder_name: str, args: Tuple, _builder: Callable, _df: pd.DataFrame) -> Any:
+    # _builder and _df are not hashed; builder_name and args identify the charts of this sheet
+    return _builder(_df, *args)
+
+def get_figures(file_path: str, sheet_name: str, builder: Callable, df: pd.DataFrame, *args) -> Any:
+    """Build charts of a loaded sheet with builder(df, *args), cached per file version"""
+    builder_name = f"{builder.__module__}.{builder.__qualname__}"
+    return _cached_figures(file_path, sheet_name, os.path.getmtime(file_path), builder_name, args, builder, df)
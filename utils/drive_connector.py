@@ -1,6 +1,30 @@
 import os
-import glob
-from typing import List, Optional
+import logging
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Look for Excel files with common extensions
+EXCEL_EXTENSIONS = ('.xlsx', '.xls', '.xlsm')
+
+# Listings are keyed by the directory mtime, which changes whenever an entry is
+# added, removed or renamed, so a stale listing is never served
+
+@lru_cache(maxsize=64)
+def _list_folders(folder: str, mtime: float) -> Tuple[str, ...]:
+    with os.scandir(folder) as entries:
+        return tuple(sorted(entry.name for entry in entries if entry.is_dir()))
+
+@lru_cache(maxsize=64)
+def _list_excel_files(folder: str, mtime: float) -> Tuple[str, ...]:
+    with os.scandir(folder) as entries:
+        return tuple(sorted(
+            entry.name for entry in entries
+            if entry.name.lower().endswith(EXCEL_EXTENSIONS)
+            and not entry.name.startswith(('~', '.'))  # Skip temporary and hidden files
+            and entry.is_file()
+        ))
 
 class DriveConnector:
     """Handles connection to shared drive and file operations"""
@@ -14,16 +38,10 @@ class DriveConnector:
             if not os.path.exists(construction_folder):
                 return []
             
-            folders = []
-            for item in os.listdir(construction_folder):
-                item_path = os.path.join(construction_folder, item)
-                if os.path.isdir(item_path):
-                    folders.append(item)
-            
-            return sorted(folders)
+            return list(_list_folders(construction_folder, os.path.getmtime(construction_folder)))
         
-        except Exception as e:
-            print(f"Error getting project folders: {str(e)}")
+        except Exception:
+            logger.exception("Error getting project folders")
             return []
     
     def get_excel_files(self, project_path: str) -> List[str]:
@@ -32,22 +50,10 @@ class DriveConnector:
             if not os.path.exists(project_path):
                 return []
             
-            excel_files = []
-            
-            # Look for Excel files with common extensions
-            patterns = ['*.xlsx', '*.xls', '*.xlsm']
-            
-            for pattern in patterns:
-                files = glob.glob(os.path.join(project_path, pattern))
-                for file_path in files:
-                    filename = os.path.basename(file_path)
-                    if not filename.startswith('~'):  # Skip temporary files
-                        excel_files.append(filename)
-            
-            return sorted(list(set(excel_files)))  # Remove duplicates and sort
+            return list(_list_excel_files(project_path, os.path.getmtime(project_path)))
         
-        except Exception as e:
-            print(f"Error getting Excel files: {str(e)}")
+        except Exception:
+            logger.exception("Error getting Excel files")
             return []
     
     def get_file_path(self, construction_folder: str, project: str, filename: str) -> str:
@@ -71,6 +77,6 @@ class DriveConnector:
                 'created': stat.st_ctime
             }
         
-        except Exception as e:
-            print(f"Error getting file info: {str(e)}")
+        except Exception:
+            logger.exception("Error getting file info")
             return None
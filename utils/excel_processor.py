@@ -1,8 +1,33 @@
 import pandas as pd
 import openpyxl
 from openpyxl.utils.dataframe import dataframe_to_rows
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
+from xml.etree import ElementTree
 import os
+import logging
+import zipfile
+from utils.fast_stats import col_stats
+
+logger = logging.getLogger(__name__)
+
+# Arrow-backed columns are smaller and have faster count/unique/null kernels
+try:
+    import pyarrow  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Fonts used when writing the Statistics sheet
+TITLE_FONT = openpyxl.styles.Font(bold=True, size=14)
+BOLD_FONT = openpyxl.styles.Font(bold=True)
+NOTE_FONT = openpyxl.styles.Font(italic=True)
+
+# The calamine engine (Rust) parses sheets several times faster than openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None
 
 class ExcelProcessor:
     """Handles Excel file processing and manipulation"""
@@ -13,27 +38,75 @@ class ExcelProcessor:
     def get_sheet_names(self, file_path: str) -> List[str]:
         """Get list of sheet names in an Excel file"""
         try:
-            workbook = openpyxl.load_workbook(file_path, read_only=True)
-            sheet_names = workbook.sheetnames
-            workbook.close()
-            return sheet_names
+            try:
+                return list(self._iter_sheet_names(file_path))
+            except (zipfile.BadZipFile, KeyError):
+                # Not a standard workbook package, let openpyxl work it out
+                workbook = openpyxl.load_workbook(file_path, read_only=True, keep_links=False)
+                sheet_names = workbook.sheetnames
+                workbook.close()
+                return sheet_names
         
-        except Exception as e:
-            print(f"Error getting sheet names: {str(e)}")
+        except Exception:
+            logger.exception("Error getting sheet names")
             return []
     
-    def load_sheet_data(self, file_path: str, sheet_name: str) -> Optional[pd.DataFrame]:
-        """Load data from a specific sheet"""
+    def _iter_sheet_names(self, file_path: str) -> Iterator[str]:
+        """Yield sheet names from xl/workbook.xml without loading styles or shared strings"""
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open('xl/workbook.xml') as workbook_xml:
+                for _, element in ElementTree.iterparse(workbook_xml):
+                    if element.tag.rsplit('}', 1)[-1] == 'sheet':
+                        yield element.get('name')
+    
+    def get_sheet_row_counts(self, file_path: str) -> Dict[str, int]:
+        """Get number of data rows per sheet without loading cell values"""
+        try:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                row_counts = {}
+                for worksheet in workbook.worksheets:
+                    max_row = worksheet.max_row
+                    if max_row is None:
+                        # Sheet has no stored dimensions, count rows by streaming them
+                        max_row = sum(1 for _ in worksheet.iter_rows(values_only=True))
+                    
+                    # Exclude the header row
+                    row_counts[worksheet.title] = max(max_row - 1, 0)
+            finally:
+                workbook.close()
+            
+            return row_counts
+        
+        except Exception:
+            logger.exception("Error getting sheet row counts")
+            return {}
+    
+    def load_sheet_data(self, file_path: str, sheet_name: str, nrows: Optional[int] = None, skiprows: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Load data from a specific sheet, optionally only a window of its rows"""
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+            df = pd.read_excel(
+                file_path,
+                sheet_name=sheet_name,
+                engine=EXCEL_ENGINE,
+                nrows=nrows,
+                skiprows=range(1, skiprows + 1) if skiprows else None
+            )
             
             # Clean the data
             df = self._clean_dataframe(df)
             
+            if ARROW_AVAILABLE:
+                df = df.convert_dtypes(dtype_backend='pyarrow')
+                
+                # Mixed-type columns stay object, store them as Arrow strings like read_excel(dtype_backend='pyarrow') does
+                for col in df.select_dtypes(include=['object']).columns:
+                    df[col] = df[col].astype('string[pyarrow]')
+            
             return df
         
-        except Exception as e:
-            print(f"Error loading sheet data: {str(e)}")
+        except Exception:
+            logger.exception("Error loading sheet data")
             return None
     
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -42,26 +115,48 @@ class ExcelProcessor:
             # Remove completely empty rows and columns
             df = df.dropna(how='all').dropna(axis=1, how='all')
             
-            # Convert date columns
-            for col in df.columns:
-                if 'date' in col.lower() or 'time' in col.lower():
-                    try:
-                        df[col] = pd.to_datetime(df[col], errors='ignore')
-                    except:
-                        pass
+            # Only text and mixed columns need converting, select them once
+            for col in df.select_dtypes(include=['object', 'string']).columns:
+                series = df[col]
+                
+                # Keep a conversion only if it did not turn any value into a missing one
+                if 'date' in str(col).lower() or 'time' in str(col).lower():
+                    converted = pd.to_datetime(series, errors='coerce', format='mixed', cache=True)
+                    if not (converted.isna() & series.notna()).any():
+                        df[col] = converted
+                        continue
+                
+                converted = pd.to_numeric(series, errors='coerce')
+                if not (converted.isna() & series.notna()).any():
+                    df[col] = converted
             
-            # Convert numeric columns
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    # Try to convert to numeric
-                    numeric_series = pd.to_numeric(df[col], errors='ignore')
-                    if not numeric_series.equals(df[col]):
-                        df[col] = numeric_series
+            # Store numbers in the smallest dtype that holds them exactly
+            for col in df.select_dtypes(include=['integer']).columns:
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            
+            for col in df.select_dtypes(include=['floating']).columns:
+                downcast = pd.to_numeric(df[col], downcast='float')
+                if downcast.astype('float64').equals(df[col].astype('float64')):
+                    df[col] = downcast
+            
+            # Repeated labels (locations, trades, statuses) are stored once each. Only pure text
+            # columns qualify, mixed-type categories cannot be converted to Arrow for display
+            for col in df.select_dtypes(include=['object', 'string']).columns:
+                if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) != 'string':
+                    continue
+                if df[col].nunique() / max(len(df), 1) < 0.5:
+                    df[col] = df[col].astype('category')
+            
+            # Record date-like columns once so charts do not rescan every column
+            df.attrs['date_cols'] = [
+                col for col in df.columns
+                if 'date' in str(col).lower() or pd.api.types.is_datetime64_any_dtype(df[col].dtype)
+            ]
             
             return df
         
-        except Exception as e:
-            print(f"Error cleaning dataframe: {str(e)}")
+        except Exception:
+            logger.exception("Error cleaning dataframe")
             return df
     
     def create_statistics_sheet(self, file_path: str, data: pd.DataFrame, selected_columns: List[str]) -> bool:
@@ -78,72 +173,67 @@ class ExcelProcessor:
             # Create new Statistics sheet
             stats_sheet = workbook.create_sheet('Statistics')
             
-            # Add header
-            stats_sheet['A1'] = 'Construction Project Statistics'
-            stats_sheet['A1'].font = openpyxl.styles.Font(bold=True, size=14)
+            # Add column-wise statistics for numeric columns
+            numeric_cols = data.select_dtypes(include=['number']).columns
+            stats_cols = [col for col in numeric_cols if col in selected_columns or not selected_columns]
             
-            # Add selected columns information
-            row = 3
-            stats_sheet[f'A{row}'] = 'Selected Columns for Analysis:'
-            stats_sheet[f'A{row}'].font = openpyxl.styles.Font(bold=True)
+            # All reductions for all columns in one pass
+            if stats_cols:
+                stats = col_stats(data, stats_cols)
             
-            row += 1
-            for col in selected_columns:
-                stats_sheet[f'A{row}'] = f"• {col}"
-                row += 1
+            # Build the sheet as (values, font) rows and write it top to bottom
+            rows = [
+                (('Construction Project Statistics',), TITLE_FONT),
+                ((), None),
+                (('Selected Columns for Analysis:',), BOLD_FONT)
+            ]
+            rows += [((f"• {col}",), None) for col in selected_columns]
             
             # Add basic statistics
-            row += 2
-            stats_sheet[f'A{row}'] = 'Basic Statistics:'
-            stats_sheet[f'A{row}'].font = openpyxl.styles.Font(bold=True)
-            
-            row += 1
-            stats_sheet[f'A{row}'] = 'Total Records:'
-            stats_sheet[f'B{row}'] = len(data)
+            rows += [
+                ((), None),
+                ((), None),
+                (('Basic Statistics:',), BOLD_FONT),
+                (('Total Records:', len(data)), None),
+                (('Total Columns:', len(data.columns)), None)
+            ]
             
-            row += 1
-            stats_sheet[f'A{row}'] = 'Total Columns:'
-            stats_sheet[f'B{row}'] = len(data.columns)
-            
-            # Add column-wise statistics for numeric columns
-            numeric_cols = data.select_dtypes(include=['number']).columns
             if len(numeric_cols) > 0:
-                row += 2
-                stats_sheet[f'A{row}'] = 'Numeric Column Statistics:'
-                stats_sheet[f'A{row}'].font = openpyxl.styles.Font(bold=True)
-                
-                row += 1
-                # Headers
-                stats_sheet[f'A{row}'] = 'Column'
-                stats_sheet[f'B{row}'] = 'Count'
-                stats_sheet[f'C{row}'] = 'Mean'
-                stats_sheet[f'D{row}'] = 'Min'
-                stats_sheet[f'E{row}'] = 'Max'
-                stats_sheet[f'F{row}'] = 'Sum'
-                
-                # Make headers bold
-                for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-                    stats_sheet[f'{col}{row}'].font = openpyxl.styles.Font(bold=True)
+                rows += [
+                    ((), None),
+                    (('Numeric Column Statistics:',), BOLD_FONT),
+                    (('Column', 'Count', 'Mean', 'Min', 'Max', 'Sum'), BOLD_FONT)
+                ]
                 
                 # Add statistics for each numeric column
-                for col in numeric_cols:
-                    if col in selected_columns or not selected_columns:
-                        row += 1
-                        stats_sheet[f'A{row}'] = col
-                        stats_sheet[f'B{row}'] = data[col].count()
-                        stats_sheet[f'C{row}'] = round(data[col].mean(), 2) if data[col].count() > 0 else 0
-                        stats_sheet[f'D{row}'] = data[col].min() if data[col].count() > 0 else 0
-                        stats_sheet[f'E{row}'] = data[col].max() if data[col].count() > 0 else 0
-                        stats_sheet[f'F{row}'] = data[col].sum() if data[col].count() > 0 else 0
+                for col in stats_cols:
+                    count = int(stats.at['count', col])
+                    if count > 0:
+                        rows.append(((
+                            col,
+                            count,
+                            round(float(stats.at['mean', col]), 2),
+                            stats.at['min', col],
+                            stats.at['max', col],
+                            stats.at['sum', col]
+                        ), None))
+                    else:
+                        rows.append(((col, count, 0, 0, 0, 0), None))
             
             # Add note about graph generation
-            row += 3
-            stats_sheet[f'A{row}'] = 'Note: Graphs are generated in the web application based on selected columns.'
-            stats_sheet[f'A{row}'].font = openpyxl.styles.Font(italic=True)
+            rows += [
+                ((), None),
+                ((), None),
+                (('Note: Graphs are generated in the web application based on selected columns.',), NOTE_FONT),
+                (('Use the PowerPoint export feature to generate presentation slides.',), NOTE_FONT)
+            ]
             
-            row += 1
-            stats_sheet[f'A{row}'] = 'Use the PowerPoint export feature to generate presentation slides.'
-            stats_sheet[f'A{row}'].font = openpyxl.styles.Font(italic=True)
+            # The sheet is new, so appended rows start at row 1
+            for row, (values, font) in enumerate(rows, start=1):
+                stats_sheet.append(values)
+                if font is not None:
+                    for column in range(1, len(values) + 1):
+                        stats_sheet.cell(row=row, column=column).font = font
             
             # Save the workbook
             workbook.save(file_path)
@@ -151,8 +241,8 @@ class ExcelProcessor:
             
             return True
         
-        except Exception as e:
-            print(f"Error creating statistics sheet: {str(e)}")
+        except Exception:
+            logger.exception("Error creating statistics sheet")
             return False
     
     def get_column_info(self, file_path: str, sheet_name: str) -> Dict[str, Any]:
@@ -184,14 +274,17 @@ class ExcelProcessor:
             
             return column_info
         
-        except Exception as e:
-            print(f"Error getting column info: {str(e)}")
+        except Exception:
+            logger.exception("Error getting column info")
             return {}
     
     def has_statistics_sheet(self, file_path: str) -> bool:
         """Check if file has a Statistics sheet"""
         try:
-            sheet_names = self.get_sheet_names(file_path)
-            return 'Statistics' in sheet_names
+            try:
+                # Stop reading workbook.xml as soon as the sheet is found
+                return any(name == 'Statistics' for name in self._iter_sheet_names(file_path))
+            except (zipfile.BadZipFile, KeyError):
+                return 'Statistics' in self.get_sheet_names(file_path)
         except:
             return False
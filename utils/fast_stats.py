@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+# Numba compiles the per-column kernel to parallel machine code; plain NumPy
+# reductions give the same results when it is not installed
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Row labels of the frame returned by col_stats
+STAT_NAMES = ['count', 'sum', 'mean', 'min', 'max', 'std']
+
+def _col_stats_numpy(arr: np.ndarray) -> np.ndarray:
+    """Column statistics with whole-array NumPy reductions"""
+    present = ~np.isnan(arr)
+    count = present.sum(axis=0)
+    total = np.where(present, arr, 0.0).sum(axis=0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        low = np.where(present, arr, np.inf).min(axis=0, initial=np.inf)
+        high = np.where(present, arr, -np.inf).max(axis=0, initial=-np.inf)
+        centered = np.where(present, arr - mean, 0.0)
+        std = np.sqrt((centered * centered).sum(axis=0) / (count - 1))
+    
+    empty = count == 0
+    low[empty] = np.nan
+    high[empty] = np.nan
+    std[count < 2] = np.nan
+    
+    return np.vstack([count, total, mean, low, high, std])
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _col_stats_numba(arr):
+        """Column statistics in one pass per column (Welford mean and variance), columns in parallel"""
+        n_rows, n_cols = arr.shape
+        out = np.full((6, n_cols), np.nan)
+        
+        for j in prange(n_cols):
+            count = 0
+            total = 0.0
+            mean = 0.0
+            m2 = 0.0
+            low = np.inf
+            high = -np.inf
+            
+            for i in range(n_rows):
+                value = arr[i, j]
+                if np.isnan(value):
+                    continue
+                count += 1
+                total += value
+                delta = value - mean
+                mean += delta / count
+                m2 += delta * (value - mean)
+                if value < low:
+                    low = value
+                if value > high:
+                    high = value
+            
+            out[0, j] = count
+            out[1, j] = total
+            if count > 0:
+                out[2, j] = mean
+                out[3, j] = low
+                out[4, j] = high
+            if count > 1:
+                out[5, j] = np.sqrt(m2 / (count - 1))
+        
+        return out
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _histogram_numba(arr, edges):
+        """Count finite values per equal-width bin, chunks of the array in parallel"""
+        n_bins = len(edges) - 1
+        low = edges[0]
+        scale = n_bins / (edges[-1] - low)
+        n_chunks = 64
+        chunk = -(-len(arr) // n_chunks)
+        partial = np.zeros((n_chunks, n_bins), dtype=np.int64)
+        
+        for c in prange(n_chunks):
+            for i in range(c * chunk, min((c + 1) * chunk, len(arr))):
+                value = arr[i]
+                if not np.isfinite(value):
+                    continue
+                
+                # Same bin placement as np.histogram, the last bin includes its right edge
+                index = int((value - low) * scale)
+                if index >= n_bins:
+                    index = n_bins - 1
+                if value < edges[index]:
+                    index -= 1
+                elif index < n_bins - 1 and value >= edges[index + 1]:
+                    index += 1
+                partial[c, index] += 1
+        
+        return partial.sum(axis=0)
+
+def histogram(values: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get (counts, edges) of equal-width bins over the finite values, like np.histogram"""
+    finite = values[np.isfinite(values)]
+    
+    if not NUMBA_AVAILABLE or len(finite) == 0:
+        return np.histogram(finite, bins=bins)
+    
+    low, high = finite.min(), finite.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    
+    return _histogram_numba(values, edges), edges
+
+def col_stats(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Get count, sum, mean, min, max and std of numeric columns, indexed like DataFrame.agg"""
+    # Column-major layout keeps each column's values contiguous for the kernel
+    arr = np.asfortranarray(df[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+    
+    if NUMBA_AVAILABLE:
+        stats = _col_stats_numba(arr)
+    else:
+        stats = _col_stats_numpy(arr)
+    
+    stats = pd.DataFrame(stats, index=STAT_NAMES, columns=columns)
+    
+    # Integer columns report sum, min and max as integers, like their own reductions do
+    int_cols = [col for col in columns if pd.api.types.is_integer_dtype(df[col].dtype)]
+    if int_cols:
+        stats = stats.astype(object)
+        for col in int_cols:
+            if stats.at['count', col] > 0:
+                for name in ('sum', 'min', 'max'):
+                    stats.at[name, col] = int(stats.at[name, col])
+    
+    return stats
+
+def count_missing(df: pd.DataFrame) -> int:
+    """Count missing cells across a whole frame with one pass over a single bool buffer"""
+    return int(np.count_nonzero(df.isna().to_numpy()))
+
+def group_sums(keys: pd.Series, values: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum positive and negative values separately per distinct key in order of first appearance, skipping missing keys and values"""
+    codes, uniques = pd.factorize(keys, sort=False)
+    weights = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    valid = codes >= 0
+    codes, weights = codes[valid], np.nan_to_num(weights[valid])
+    positive = np.bincount(codes, weights=np.maximum(weights, 0), minlength=len(uniques))
+    negative = np.bincount(codes, weights=np.minimum(weights, 0), minlength=len(uniques))
+    
+    return np.asarray(uniques), positive, negative
+
+def value_counts(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Count each distinct value, skipping missing values, without building a sorted Series"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Categories are already the distinct values, count their codes
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+        present = counts > 0
+        return values.cat.categories.to_numpy()[present], counts[present]
+    
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+        arr = values.to_numpy()
+        if arr.dtype.kind == 'f':
+            arr = arr[~np.isnan(arr)]
+        return np.unique(arr, return_counts=True)
+    
+    # np.unique sorts object arrays with Python comparisons, pandas' hash table is faster there
+    counts = values.value_counts()
+    return counts.index.to_numpy(), counts.to_numpy()
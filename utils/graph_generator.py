@@ -1,9 +1,206 @@
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
-from typing import List, Optional, Dict, Any
+import numpy as np
+from typing import Callable, List, Optional, Dict, Any
 import io
-import base64
+import atexit
+import hashlib
+import threading
+import functools
+import logging
+from collections import OrderedDict
+from utils.fast_stats import histogram, value_counts
+
+logger = logging.getLogger(__name__)
+
+# pybase64 encodes with SIMD instructions and has the same interface as the standard library module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Serialize figures with orjson when available, it is several times faster than json.
+# Set here so every page and the image export use it, not only the main page
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = "orjson"
+except ImportError:
+    pass
+
+# Row counts above which charts switch to cheaper rendering paths
+WEBGL_THRESHOLD = 1000
+HISTOGRAM_PREBIN_THRESHOLD = 10000
+PLOT_MAX_POINTS = 5000
+
+def to_plot_array(series: pd.Series) -> np.ndarray:
+    """Convert a column to a NumPy array that Plotly can send as a typed array"""
+    if pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_numeric_dtype(series.dtype) and series.hasnans:
+        # Nullable numeric columns with missing values would otherwise become object arrays
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    
+    arr = series.to_numpy()
+    
+    # int64 values that fit in int32 take half the bytes on the wire
+    if arr.dtype == np.int64 and len(arr) > 0:
+        int32_info = np.iinfo(np.int32)
+        if int32_info.min <= arr.min() and arr.max() <= int32_info.max:
+            arr = arr.astype(np.int32)
+    
+    return arr
+
+def downsample(df: pd.DataFrame, columns: List[str], max_points: int = PLOT_MAX_POINTS) -> pd.DataFrame:
+    """Keep every n-th row of the given columns so at most max_points rows are plotted"""
+    columns = list(dict.fromkeys(columns))
+    if len(df) <= max_points:
+        return df[columns]
+    step = -(-len(df) // max_points)
+    return df[columns].iloc[::step]
+
+def _axis_values(series: pd.Series) -> np.ndarray:
+    """Get a column as float positions for geometric downsampling, missing values as 0"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        stamps = pd.DatetimeIndex(series)
+        values = np.where(stamps.isna(), np.nan, stamps.asi8.astype(float))
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        # Text axes are drawn in row order
+        values = np.arange(len(series), dtype=float)
+    return np.nan_to_num(values)
+
+def lttb_downsample(df: pd.DataFrame, x_col: str, y_col: str, max_points: int = PLOT_MAX_POINTS) -> pd.DataFrame:
+    """Pick at most max_points rows for a line chart with Largest-Triangle-Three-Buckets, keeping peaks and dips"""
+    columns = list(dict.fromkeys([x_col, y_col]))
+    n = len(df)
+    if n <= max_points or max_points < 3:
+        return df[columns]
+    
+    x = _axis_values(df[x_col])
+    y = _axis_values(df[y_col])
+    
+    # The first and last rows are always kept, the rows between are split into max_points - 2 buckets
+    edges = np.append(np.linspace(1, n - 1, max_points - 1).astype(int), n)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    
+    selected = 0
+    for i in range(max_points - 2):
+        start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's average
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
+    
+    return df[columns].iloc[indices]
+
+# Image exports share one Kaleido (headless Chromium) process instead of starting one per figure
+_export_lock = threading.Lock()
+_export_engine_started = False
+_export_concurrent = False
+
+# Chromium tabs the shared Kaleido process renders in, and threads feeding them
+EXPORT_WORKERS = 4
+
+def _start_export_engine():
+    """Start the persistent Kaleido process, if this Kaleido version needs one started"""
+    global _export_engine_started, _export_concurrent
+    if _export_engine_started:
+        return
+    _export_engine_started = True
+    
+    try:
+        import kaleido
+    except ImportError:
+        return
+    
+    # Kaleido >= 1.0 launches Chromium for every call unless its sync server is running,
+    # older versions keep their subprocess alive on their own
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server(n=EXPORT_WORKERS, silence_warnings=True)
+        atexit.register(kaleido.stop_sync_server, silence_warnings=True)
+        
+        # The sync server queues calls from any thread onto its tabs
+        _export_concurrent = True
+
+def _render_uncached(fig: go.Figure, format: str, width: int, height: int, scale: int) -> bytes:
+    """Render a figure to image bytes through the shared Kaleido process"""
+    with _export_lock:
+        _start_export_engine()
+        if not _export_concurrent:
+            # The legacy Kaleido subprocess handles one request at a time
+            return fig.to_image(format=format, width=width, height=height, scale=scale)
+    
+    return fig.to_image(format=format, width=width, height=height, scale=scale)
+
+# Recent renders keyed by a digest of the figure JSON, shared by all sessions
+RENDER_CACHE_SIZE = 64
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+def render_image(fig: go.Figure, format: str = "png", width: int = 800, height: int = 600, scale: int = 2) -> bytes:
+    """Render a figure to image bytes, reusing the bytes of an identical earlier render"""
+    fig_digest = hashlib.blake2b(fig.to_json().encode(), digest_size=16).hexdigest()
+    key = (fig_digest, format, width, height, scale)
+    
+    with _render_cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+    
+    img_bytes = _render_uncached(fig, format, width, height, scale)
+    
+    with _render_cache_lock:
+        _render_cache[key] = img_bytes
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    
+    return img_bytes
+
+# Shared look of all generated charts: the default Plotly template with the Set3 colorway.
+# Registered once so figures reference it instead of re-applying layout per chart
+CHART_TEMPLATE = 'site_manager'
+_chart_template = go.layout.Template(pio.templates['plotly'])
+_chart_template.layout.colorway = px.colors.qualitative.Set3
+pio.templates[CHART_TEMPLATE] = _chart_template
+
+def _validate(df: pd.DataFrame, *cols: Optional[str], numeric: bool = False):
+    """Check chart columns against the frame's schema before any data is touched, raising ValueError"""
+    cols = [col for col in cols if col is not None]
+    
+    missing = [col for col in cols if col not in df.columns]
+    if missing:
+        raise ValueError(f"column(s) not found: {', '.join(map(str, missing))}")
+    
+    if numeric:
+        non_numeric = [col for col in cols if not pd.api.types.is_numeric_dtype(df[col].dtype)]
+        if non_numeric:
+            raise ValueError(f"column(s) not numeric: {', '.join(map(str, non_numeric))}")
+
+def _validate_arrays(*arrays: np.ndarray):
+    """Check that column arrays plotted against each other have the same length, raising ValueError"""
+    if len({len(arr) for arr in arrays}) > 1:
+        raise ValueError(f"array lengths differ: {', '.join(str(len(arr)) for arr in arrays)}")
+
+def safe_chart(description: str) -> Callable:
+    """Decorate a chart method so any error is logged and None returned instead of raising"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                logger.exception("Error creating %s", description)
+                return None
+        return wrapper
+    return decorator
 
 class GraphGenerator:
     """Handles graph generation for various chart types"""
@@ -11,211 +208,264 @@ class GraphGenerator:
     def __init__(self):
         self.color_palette = px.colors.qualitative.Set3
     
+    @safe_chart("bar chart")
     def create_bar_chart(self, df: pd.DataFrame, x_col: str, y_col: str, title: str = None) -> go.Figure:
         """Create a bar chart"""
-        try:
-            fig = px.bar(
-                df, 
-                x=x_col, 
-                y=y_col,
-                title=title or f"{y_col} by {x_col}",
-                color_discrete_sequence=self.color_palette
-            )
-            
-            fig.update_layout(
-                xaxis_title=x_col,
-                yaxis_title=y_col,
-                showlegend=False
+        _validate(df, x_col, y_col)
+        
+        return self.create_bar_chart_arr(to_plot_array(df[x_col]), to_plot_array(df[y_col]), x_col, y_col, title)
+    
+    @safe_chart("bar chart")
+    def create_bar_chart_arr(self, x: np.ndarray, y: np.ndarray, x_name: str, y_name: str, title: str = None) -> go.Figure:
+        """Create a bar chart from column arrays"""
+        _validate_arrays(x, y)
+        
+        fig = go.Figure(
+            go.Bar(
+                x=x,
+                y=y,
+                marker_color=self.color_palette[0]
+            ),
+            layout=dict(
+                title=title or f"{y_name} by {x_name}",
+                xaxis_title=x_name,
+                yaxis_title=y_name,
+                # Stack rows sharing an x value the way px.bar does, rather than overlapping them
+                barmode='relative',
+                template=CHART_TEMPLATE
             )
-            
-            return fig
+        )
         
-        except Exception as e:
-            print(f"Error creating bar chart: {str(e)}")
-            return None
+        return fig
     
+    @safe_chart("line chart")
     def create_line_chart(self, df: pd.DataFrame, x_col: str, y_col: str, title: str = None) -> go.Figure:
         """Create a line chart"""
-        try:
-            fig = px.line(
-                df, 
-                x=x_col, 
-                y=y_col,
-                title=title or f"{y_col} over {x_col}",
-                color_discrete_sequence=self.color_palette
-            )
-            
-            fig.update_layout(
-                xaxis_title=x_col,
-                yaxis_title=y_col
+        _validate(df, x_col, y_col)
+        
+        # Long series are reduced to PLOT_MAX_POINTS rows that keep the visible peaks and dips
+        plot_df = lttb_downsample(df, x_col, y_col)
+        
+        return self.create_line_chart_arr(to_plot_array(plot_df[x_col]), to_plot_array(plot_df[y_col]), x_col, y_col, title)
+    
+    @safe_chart("line chart")
+    def create_line_chart_arr(self, x: np.ndarray, y: np.ndarray, x_name: str, y_name: str, title: str = None) -> go.Figure:
+        """Create a line chart from column arrays, plotted as given without downsampling"""
+        _validate_arrays(x, y)
+        
+        fig = go.Figure(
+            go.Scatter(
+                x=x,
+                y=y,
+                mode='lines',
+                line_color=self.color_palette[0]
+            ),
+            layout=dict(
+                title=title or f"{y_name} over {x_name}",
+                xaxis_title=x_name,
+                yaxis_title=y_name,
+                template=CHART_TEMPLATE
             )
-            
-            return fig
+        )
         
-        except Exception as e:
-            print(f"Error creating line chart: {str(e)}")
-            return None
+        return fig
     
+    @safe_chart("scatter plot")
     def create_scatter_plot(self, df: pd.DataFrame, x_col: str, y_col: str, title: str = None) -> go.Figure:
         """Create a scatter plot"""
-        try:
-            fig = px.scatter(
-                df, 
-                x=x_col, 
-                y=y_col,
-                title=title or f"{y_col} vs {x_col}",
-                color_discrete_sequence=self.color_palette
-            )
-            
-            fig.update_layout(
-                xaxis_title=x_col,
-                yaxis_title=y_col
+        _validate(df, x_col, y_col)
+        
+        return self.create_scatter_plot_arr(to_plot_array(df[x_col]), to_plot_array(df[y_col]), x_col, y_col, title)
+    
+    @safe_chart("scatter plot")
+    def create_scatter_plot_arr(self, x: np.ndarray, y: np.ndarray, x_name: str, y_name: str, title: str = None) -> go.Figure:
+        """Create a scatter plot from column arrays"""
+        _validate_arrays(x, y)
+        
+        # Large point clouds are drawn with WebGL, like the scatter charts on the pages
+        trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+        
+        fig = go.Figure(
+            trace(
+                x=x,
+                y=y,
+                mode='markers',
+                marker_color=self.color_palette[0]
+            ),
+            layout=dict(
+                title=title or f"{y_name} vs {x_name}",
+                xaxis_title=x_name,
+                yaxis_title=y_name,
+                template=CHART_TEMPLATE
             )
-            
-            return fig
+        )
         
-        except Exception as e:
-            print(f"Error creating scatter plot: {str(e)}")
-            return None
+        return fig
     
+    @safe_chart("pie chart")
     def create_pie_chart(self, df: pd.DataFrame, values_col: str, names_col: str = None, title: str = None) -> go.Figure:
         """Create a pie chart"""
-        try:
-            if names_col:
-                fig = px.pie(
-                    df, 
-                    values=values_col, 
-                    names=names_col,
-                    title=title or f"Distribution of {values_col}",
-                    color_discrete_sequence=self.color_palette
-                )
-            else:
-                # Create pie chart from value counts
-                value_counts = df[values_col].value_counts()
-                fig = px.pie(
-                    values=value_counts.values, 
-                    names=value_counts.index,
-                    title=title or f"Distribution of {values_col}",
-                    color_discrete_sequence=self.color_palette
-                )
-            
-            return fig
-        
-        except Exception as e:
-            print(f"Error creating pie chart: {str(e)}")
-            return None
-    
-    def create_histogram(self, df: pd.DataFrame, col: str, bins: int = 20, title: str = None) -> go.Figure:
-        """Create a histogram"""
-        try:
-            fig = px.histogram(
+        _validate(df, values_col, names_col)
+        
+        if names_col:
+            fig = px.pie(
                 df, 
-                x=col,
-                nbins=bins,
-                title=title or f"Distribution of {col}",
-                color_discrete_sequence=self.color_palette
+                values=values_col, 
+                names=names_col,
+                title=title or f"Distribution of {values_col}",
+                template=CHART_TEMPLATE
             )
-            
-            fig.update_layout(
-                xaxis_title=col,
-                yaxis_title="Frequency"
+        else:
+            # Create pie chart from value counts
+            names, counts = value_counts(df[values_col])
+            fig = px.pie(
+                values=counts, 
+                names=names,
+                title=title or f"Distribution of {values_col}",
+                template=CHART_TEMPLATE
             )
-            
-            return fig
         
-        except Exception as e:
-            print(f"Error creating histogram: {str(e)}")
-            return None
+        return fig
+    
+    @safe_chart("histogram")
+    def create_histogram(self, df: pd.DataFrame, col: str, bins: int = 20, title: str = None) -> go.Figure:
+        """Create a histogram"""
+        _validate(df, col)
+        
+        # Large numeric columns are binned here instead of shipping every value to the browser
+        if len(df) > HISTOGRAM_PREBIN_THRESHOLD and pd.api.types.is_numeric_dtype(df[col].dtype):
+            return self.create_prebinned_histogram(df, col, bins=bins, title=title)
+        
+        fig = px.histogram(
+            df, 
+            x=col,
+            nbins=bins,
+            title=title or f"Distribution of {col}",
+            template=CHART_TEMPLATE
+        )
+        
+        # px titles the count axis "count"
+        fig.update_layout(yaxis_title="Frequency")
+        
+        return fig
+    
+    @safe_chart("prebinned histogram")
+    def create_prebinned_histogram(self, df: pd.DataFrame, col: str, bins: int = 50, title: str = None) -> go.Figure:
+        """Create a histogram binned server-side, for columns too large to bin in the browser"""
+        _validate(df, col, numeric=True)
+        
+        return self.create_histogram_arr(df[col].to_numpy(dtype=float, na_value=np.nan), col, bins=bins, title=title)
     
+    @safe_chart("histogram")
+    def create_histogram_arr(self, values: np.ndarray, name: str, bins: int = 20, title: str = None) -> go.Figure:
+        """Create a histogram of a numeric column array, binned server-side"""
+        counts, edges = histogram(np.asarray(values, dtype=float), bins)
+        
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            marker_color=self.color_palette[0]
+        ))
+        
+        fig.update_layout(
+            title=title or f"Distribution of {name}",
+            xaxis_title=name,
+            yaxis_title="Frequency",
+            bargap=0,
+            template=CHART_TEMPLATE
+        )
+        
+        return fig
+    
+    @safe_chart("box plot")
     def create_box_plot(self, df: pd.DataFrame, y_col: str, x_col: str = None, title: str = None) -> go.Figure:
         """Create a box plot"""
-        try:
-            if x_col:
-                fig = px.box(
-                    df, 
-                    x=x_col, 
-                    y=y_col,
-                    title=title or f"{y_col} by {x_col}",
-                    color_discrete_sequence=self.color_palette
-                )
-            else:
-                fig = px.box(
-                    df, 
-                    y=y_col,
-                    title=title or f"Distribution of {y_col}",
-                    color_discrete_sequence=self.color_palette
-                )
-            
-            return fig
-        
-        except Exception as e:
-            print(f"Error creating box plot: {str(e)}")
-            return None
+        _validate(df, y_col, x_col)
+        
+        if x_col:
+            fig = px.box(
+                df, 
+                x=x_col, 
+                y=y_col,
+                title=title or f"{y_col} by {x_col}",
+                template=CHART_TEMPLATE
+            )
+        else:
+            fig = px.box(
+                df, 
+                y=y_col,
+                title=title or f"Distribution of {y_col}",
+                template=CHART_TEMPLATE
+            )
+        
+        return fig
     
+    @safe_chart("heatmap")
     def create_heatmap(self, df: pd.DataFrame, x_col: str, y_col: str, values_col: str, title: str = None) -> go.Figure:
         """Create a heatmap"""
-        try:
-            # Create pivot table for heatmap
-            pivot_table = df.pivot_table(
-                index=y_col, 
-                columns=x_col, 
-                values=values_col, 
-                aggfunc='mean'
-            )
-            
-            fig = px.imshow(
-                pivot_table,
-                title=title or f"Heatmap: {values_col} by {x_col} and {y_col}",
-                color_continuous_scale='Viridis'
-            )
-            
-            return fig
+        _validate(df, x_col, y_col)
+        _validate(df, values_col, numeric=True)
         
-        except Exception as e:
-            print(f"Error creating heatmap: {str(e)}")
-            return None
+        # Mean per (y, x) cell via groupby, which skips pivot_table's generic dispatch;
+        # like pivot_table, columns with no values at all are dropped
+        pivot_table = (
+            df.groupby([y_col, x_col], observed=True)[values_col]
+            .mean()
+            .unstack(x_col)
+            .dropna(axis=1, how='all')
+        )
+        
+        fig = px.imshow(
+            pivot_table,
+            title=title or f"Heatmap: {values_col} by {x_col} and {y_col}",
+            color_continuous_scale='Viridis',
+            template=CHART_TEMPLATE
+        )
+        
+        return fig
     
+    @safe_chart("multi-column chart")
     def create_multi_column_chart(self, df: pd.DataFrame, columns: List[str], chart_type: str = "bar") -> go.Figure:
         """Create chart with multiple columns"""
-        try:
-            if len(columns) < 2:
-                return None
-            
-            if chart_type == "bar":
-                return self.create_bar_chart(df, columns[0], columns[1])
-            elif chart_type == "line":
-                return self.create_line_chart(df, columns[0], columns[1])
-            elif chart_type == "scatter":
-                return self.create_scatter_plot(df, columns[0], columns[1])
-            elif chart_type == "pie" and len(columns) >= 1:
-                return self.create_pie_chart(df, columns[0], columns[1] if len(columns) > 1 else None)
-            elif chart_type == "histogram":
-                return self.create_histogram(df, columns[0])
-            
-            return None
+        _validate(df, *columns)
         
-        except Exception as e:
-            print(f"Error creating multi-column chart: {str(e)}")
+        if len(columns) < 2:
             return None
+        
+        if chart_type == "bar":
+            return self.create_bar_chart(df, columns[0], columns[1])
+        elif chart_type == "line":
+            return self.create_line_chart(df, columns[0], columns[1])
+        elif chart_type == "scatter":
+            return self.create_scatter_plot(df, columns[0], columns[1])
+        elif chart_type == "pie" and len(columns) >= 1:
+            return self.create_pie_chart(df, columns[0], columns[1] if len(columns) > 1 else None)
+        elif chart_type == "histogram":
+            return self.create_histogram(df, columns[0])
+        
+        return None
     
     def save_figure_as_image(self, fig: go.Figure, filename: str, format: str = "png") -> str:
         """Save figure as image file"""
         try:
             # Save the figure
-            fig.write_image(filename, format=format, width=800, height=600, scale=2)
+            img_bytes = render_image(fig, format=format)
+            with open(filename, 'wb') as image_file:
+                image_file.write(img_bytes)
             return filename
         
-        except Exception as e:
-            print(f"Error saving figure: {str(e)}")
+        except Exception:
+            logger.exception("Error saving figure")
             return None
     
     def figure_to_base64(self, fig: go.Figure, format: str = "png") -> str:
         """Convert figure to base64 string"""
         try:
-            img_bytes = fig.to_image(format=format, width=800, height=600, scale=2)
-            img_base64 = base64.b64encode(img_bytes).decode()
+            img_bytes = render_image(fig, format=format)
+            img_base64 = base64.b64encode(img_bytes).decode('ascii')
             return img_base64
         
-        except Exception as e:
-            print(f"Error converting figure to base64: {str(e)}")
+        except Exception:
+            logger.exception("Error converting figure to base64")
             return None
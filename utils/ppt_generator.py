@@ -1,31 +1,117 @@
+import pptx
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.oxml.ns import qn
+from lxml import etree
 import plotly.graph_objects as go
-from typing import List, Dict, Any
+from utils.graph_generator import EXPORT_WORKERS, render_image
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, BinaryIO, Optional
 import os
+import logging
+import io
+import copy
 import tempfile
 import datetime
 
+logger = logging.getLogger(__name__)
+
+# Colours, font sizes and shape geometry shared by all slides, built once rather than per slide
+TITLE_COLOR = RGBColor(31, 73, 125)
+TEXT_COLOR = RGBColor(68, 84, 106)
+MUTED_COLOR = RGBColor(127, 127, 127)
+
+DECK_TITLE_SIZE = Pt(44)
+SUMMARY_TITLE_SIZE = Pt(36)
+BODY_SIZE = Pt(18)
+DATA_SIZE = Pt(16)
+SMALL_SIZE = Pt(12)
+BULLET_SPACING = Pt(12)
+DATA_SPACING = Pt(8)
+
+CHART_POSITION = (Inches(1), Inches(2), Inches(8), Inches(5))
+FOOTER_POSITION = (Inches(1), Inches(6.5), Inches(8), Inches(1))
+
+# Graph slides use the "Title Only" layout, whose title and slide number placeholders are styled once per template
+GRAPH_LAYOUT_INDEX = 5
+SLIDE_NUMBER_IDX = 12
+
+def _style_placeholder(placeholder, left: float, top: float, width: float, height: float, size: int, color: RGBColor, align: str, bold: bool = False):
+    """Move a layout placeholder and set the first-level text style its slide placeholders inherit"""
+    placeholder.left, placeholder.top = Inches(left), Inches(top)
+    placeholder.width, placeholder.height = Inches(width), Inches(height)
+    
+    level = etree.SubElement(etree.Element(qn('a:lstStyle')), qn('a:lvl1pPr'), algn=align)
+    run_props = etree.SubElement(level, qn('a:defRPr'), sz=str(size * 100), b='1' if bold else '0')
+    etree.SubElement(etree.SubElement(run_props, qn('a:solidFill')), qn('a:srgbClr'), val=str(color))
+    
+    body = placeholder._element.txBody
+    body.replace(body.find(qn('a:lstStyle')), level.getparent())
+
+def _bulk_add_paragraphs(text_frame, lines: List[str], size: Pt, spacing: Pt, color: Optional[RGBColor] = None):
+    """Append one formatted paragraph per line to a text frame with a single XML insertion"""
+    template = etree.Element(qn('a:p'))
+    paragraph_props = etree.SubElement(template, qn('a:pPr'))
+    etree.SubElement(etree.SubElement(paragraph_props, qn('a:spcAft')), qn('a:spcPts'), val=str(spacing.centipoints))
+    run_props = etree.SubElement(paragraph_props, qn('a:defRPr'), sz=str(size.centipoints))
+    if color is not None:
+        etree.SubElement(etree.SubElement(run_props, qn('a:solidFill')), qn('a:srgbClr'), val=str(color))
+    etree.SubElement(etree.SubElement(template, qn('a:r')), qn('a:t'))
+    
+    paragraphs = []
+    for line in lines:
+        paragraph = copy.deepcopy(template)
+        paragraph.find(f"{qn('a:r')}/{qn('a:t')}").text = line
+        paragraphs.append(paragraph)
+    
+    text_frame._txBody.extend(paragraphs)
+
+def _build_template() -> bytes:
+    """Get python-pptx's bundled default deck with the graph slide layout pre-styled"""
+    with open(os.path.join(os.path.dirname(pptx.__file__), 'templates', 'default.pptx'), 'rb') as template_file:
+        prs = Presentation(template_file)
+    
+    for placeholder in prs.slide_layouts[GRAPH_LAYOUT_INDEX].placeholders:
+        if placeholder.placeholder_format.type == PP_PLACEHOLDER.TITLE:
+            _style_placeholder(placeholder, 0.5, 0.5, 9, 1, 28, TITLE_COLOR, 'ctr', bold=True)
+        elif placeholder.placeholder_format.idx == SLIDE_NUMBER_IDX:
+            _style_placeholder(placeholder, 8.5, 7, 1, 0.5, 12, MUTED_COLOR, 'r')
+    
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
 class PPTGenerator:
     """Handles PowerPoint presentation generation"""
     
+    # Built once and opened from memory for each presentation
+    _template_bytes = _build_template()
+    
     def __init__(self):
         self.temp_dir = tempfile.mkdtemp()
+        
+        # Files written into temp_dir, so cleanup removes exactly these without scanning the directory
+        self._created: List[str] = []
     
-    def create_presentation(self, graphs: List[Dict[str, Any]], title: str = "Construction Project Report") -> str:
-        """Create PowerPoint presentation with graphs"""
+    def create_presentation(self, graphs: List[Dict[str, Any]], title: str = "Construction Project Report", out: Optional[BinaryIO] = None) -> Optional[str]:
+        """Create PowerPoint presentation with graphs, written to out if given, otherwise to a temp file"""
         try:
             # Create presentation
-            prs = Presentation()
+            prs = Presentation(io.BytesIO(self._template_bytes))
             
             # Add title slide
             self._add_title_slide(prs, title)
             
+            # Render all chart images concurrently, python-pptx itself is not thread-safe
+            with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+                images = list(executor.map(self._render_chart_png, graphs))
+            
             # Add slides for each graph
             for i, graph_data in enumerate(graphs):
-                self._add_graph_slide(prs, graph_data, i + 1)
+                self._add_graph_slide(prs, graph_data, i + 1, images[i])
             
             # Add summary slide
             self._add_summary_slide(prs, len(graphs))
@@ -33,14 +119,21 @@ class PPTGenerator:
             # Save presentation
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"{title.replace(' ', '_')}_{timestamp}.pptx"
+            
+            # In-memory output skips the disk round trip when the caller only needs the bytes
+            if out is not None:
+                prs.save(out)
+                return filename
+            
             filepath = os.path.join(self.temp_dir, filename)
             
             prs.save(filepath)
+            self._created.append(filepath)
             
             return filepath
         
-        except Exception as e:
-            print(f"Error creating presentation: {str(e)}")
+        except Exception:
+            logger.exception("Error creating presentation")
             return None
     
     def _add_title_slide(self, prs: Presentation, title: str):
@@ -61,67 +154,50 @@ class PPTGenerator:
             
             # Format title
             title_paragraph = title_placeholder.text_frame.paragraphs[0]
-            title_paragraph.font.size = Pt(44)
+            title_paragraph.font.size = DECK_TITLE_SIZE
             title_paragraph.font.bold = True
-            title_paragraph.font.color.rgb = RGBColor(31, 73, 125)
+            title_paragraph.font.color.rgb = TITLE_COLOR
             
             # Format subtitle
             for paragraph in subtitle_placeholder.text_frame.paragraphs:
-                paragraph.font.size = Pt(18)
-                paragraph.font.color.rgb = RGBColor(68, 84, 106)
+                paragraph.font.size = BODY_SIZE
+                paragraph.font.color.rgb = TEXT_COLOR
         
-        except Exception as e:
-            print(f"Error adding title slide: {str(e)}")
+        except Exception:
+            logger.exception("Error adding title slide")
     
-    def _add_graph_slide(self, prs: Presentation, graph_data: Dict[str, Any], slide_number: int):
+    def _render_chart_png(self, graph_data: Dict[str, Any]) -> Optional[bytes]:
+        """Render the graph's figure as PNG bytes for its slide"""
+        try:
+            if 'figure' not in graph_data:
+                return None
+            
+            return render_image(graph_data['figure'], width=800, height=500, scale=2)
+        
+        except Exception:
+            logger.exception("Error rendering chart image")
+            return None
+    
+    def _add_graph_slide(self, prs: Presentation, graph_data: Dict[str, Any], slide_number: int, image: Optional[bytes] = None):
         """Add slide with graph"""
         try:
-            # Use content slide layout
-            content_slide_layout = prs.slide_layouts[5]  # Blank layout
-            slide = prs.slides.add_slide(content_slide_layout)
+            # Title only layout, its placeholders carry the position and formatting
+            graph_slide_layout = prs.slide_layouts[GRAPH_LAYOUT_INDEX]
+            slide = prs.slides.add_slide(graph_slide_layout)
             
             # Add title
-            title_shape = slide.shapes.add_textbox(
-                Inches(0.5), Inches(0.5), Inches(9), Inches(1)
-            )
-            title_frame = title_shape.text_frame
-            title_frame.text = graph_data.get('title', f'Chart {slide_number}')
+            slide.shapes.title.text = graph_data.get('title', f'Chart {slide_number}')
             
-            # Format title
-            title_paragraph = title_frame.paragraphs[0]
-            title_paragraph.font.size = Pt(28)
-            title_paragraph.font.bold = True
-            title_paragraph.font.color.rgb = RGBColor(31, 73, 125)
-            title_paragraph.alignment = PP_ALIGN.CENTER
-            
-            # Add graph image
-            if 'figure' in graph_data:
-                fig = graph_data['figure']
-                
-                # Save figure as temporary image
-                img_path = os.path.join(self.temp_dir, f"chart_{slide_number}.png")
-                fig.write_image(img_path, width=800, height=500, scale=2)
-                
-                # Add image to slide
-                slide.shapes.add_picture(
-                    img_path, 
-                    Inches(1), Inches(2), 
-                    Inches(8), Inches(5)
-                )
-            
-            # Add slide number
-            slide_number_shape = slide.shapes.add_textbox(
-                Inches(8.5), Inches(7), Inches(1), Inches(0.5)
-            )
-            slide_number_frame = slide_number_shape.text_frame
-            slide_number_frame.text = str(slide_number)
-            slide_number_paragraph = slide_number_frame.paragraphs[0]
-            slide_number_paragraph.font.size = Pt(12)
-            slide_number_paragraph.font.color.rgb = RGBColor(127, 127, 127)
-            slide_number_paragraph.alignment = PP_ALIGN.RIGHT
+            # Add graph image rendered by _render_chart_png, straight from memory
+            if image:
+                slide.shapes.add_picture(io.BytesIO(image), *CHART_POSITION)
+            
+            # Add slide number, python-pptx does not copy slide number placeholders to new slides by itself
+            slide.shapes.clone_placeholder(graph_slide_layout.placeholders.get(idx=SLIDE_NUMBER_IDX))
+            slide.placeholders[SLIDE_NUMBER_IDX].text = str(slide_number)
         
-        except Exception as e:
-            print(f"Error adding graph slide: {str(e)}")
+        except Exception:
+            logger.exception("Error adding graph slide")
     
     def _add_summary_slide(self, prs: Presentation, graph_count: int):
         """Add summary slide"""
@@ -136,9 +212,9 @@ class PPTGenerator:
             
             # Format title
             title_paragraph = title_placeholder.text_frame.paragraphs[0]
-            title_paragraph.font.size = Pt(36)
+            title_paragraph.font.size = SUMMARY_TITLE_SIZE
             title_paragraph.font.bold = True
-            title_paragraph.font.color.rgb = RGBColor(31, 73, 125)
+            title_paragraph.font.color.rgb = TITLE_COLOR
             
             # Add content
             content_placeholder = slide.placeholders[1]
@@ -154,27 +230,20 @@ class PPTGenerator:
                 "Export capability for project reporting"
             ]
             
-            for point in summary_points:
-                p = content_frame.add_paragraph()
-                p.text = f"• {point}"
-                p.font.size = Pt(18)
-                p.font.color.rgb = RGBColor(68, 84, 106)
-                p.space_after = Pt(12)
+            _bulk_add_paragraphs(content_frame, [f"• {point}" for point in summary_points], BODY_SIZE, BULLET_SPACING, TEXT_COLOR)
             
             # Add footer
-            footer_shape = slide.shapes.add_textbox(
-                Inches(1), Inches(6.5), Inches(8), Inches(1)
-            )
+            footer_shape = slide.shapes.add_textbox(*FOOTER_POSITION)
             footer_frame = footer_shape.text_frame
             footer_frame.text = "Generated by Construction Project Management Dashboard"
             footer_paragraph = footer_frame.paragraphs[0]
-            footer_paragraph.font.size = Pt(12)
+            footer_paragraph.font.size = SMALL_SIZE
             footer_paragraph.font.italic = True
-            footer_paragraph.font.color.rgb = RGBColor(127, 127, 127)
+            footer_paragraph.font.color.rgb = MUTED_COLOR
             footer_paragraph.alignment = PP_ALIGN.CENTER
         
-        except Exception as e:
-            print(f"Error adding summary slide: {str(e)}")
+        except Exception:
+            logger.exception("Error adding summary slide")
     
     def add_data_slide(self, prs: Presentation, data_summary: Dict[str, Any]):
         """Add slide with data summary"""
@@ -193,20 +262,20 @@ class PPTGenerator:
             content_frame.clear()
             
             # Add data summary
-            for key, value in data_summary.items():
-                p = content_frame.add_paragraph()
-                p.text = f"{key}: {value}"
-                p.font.size = Pt(16)
-                p.space_after = Pt(8)
+            _bulk_add_paragraphs(content_frame, [f"{key}: {value}" for key, value in data_summary.items()], DATA_SIZE, DATA_SPACING)
         
-        except Exception as e:
-            print(f"Error adding data slide: {str(e)}")
+        except Exception:
+            logger.exception("Error adding data slide")
     
     def cleanup_temp_files(self):
         """Clean up temporary files"""
         try:
-            import shutil
+            for path in self._created:
+                if os.path.exists(path):
+                    os.unlink(path)
+            self._created.clear()
+            
             if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-        except Exception as e:
-            print(f"Error cleaning up temp files: {str(e)}")
+                os.rmdir(self.temp_dir)
+        except Exception:
+            logger.exception("Error cleaning up temp files")